@@ -62,11 +62,27 @@ CREATE TABLE outbox (
     total_amount DECIMAL(12,2) NOT NULL,
     payment_id INT NULL,
     order_items JSON NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    claimed_at TIMESTAMP NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
 );
 
+-- Outbox archive (processed rows moved by the retention job)
+DROP TABLE IF EXISTS outbox_archive;
+CREATE TABLE outbox_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    order_id INT NOT NULL,
+    total_amount DECIMAL(12,2) NOT NULL,
+    payment_id INT NULL,
+    order_items JSON NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Mock data: users
 INSERT INTO users (name, email) VALUES
 ('Ada Lovelace', 'alovelace@example.com'),
@@ -89,4 +105,6 @@ INSERT INTO stocks (product_id, quantity) VALUES
 
 -- Indexes
 CREATE INDEX idx_stocks_product_id ON stocks (product_id);
-CREATE INDEX idx_order_items_product_id ON order_items (product_id);
\ No newline at end of file
+CREATE INDEX idx_order_items_product_id ON order_items (product_id);
+CREATE INDEX idx_outbox_payment_id ON outbox (payment_id, id);
+CREATE INDEX idx_outbox_created_at ON outbox (created_at);
\ No newline at end of file
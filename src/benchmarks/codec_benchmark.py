@@ -0,0 +1,56 @@
+"""
+Event codecs benchmark
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+
+Compare la taille sur le réseau et le temps d'encodage/décodage d'un événement de la saga pour chaque codec.
+Usage (depuis le répertoire src) : python -m benchmarks.codec_benchmark [nombre_d_items] [iterations]
+"""
+import sys
+import time
+from datetime import datetime
+from event_management.codecs import get_codec
+
+CODEC_NAMES = ["json", "msgpack", "json+zlib", "msgpack+zlib"]
+
+
+def make_event(item_count):
+    """Build an OrderCreated event similar to the ones produced by add_order"""
+    return {
+        'event': 'OrderCreated',
+        'order_id': 123456,
+        'user_id': 42,
+        'total_amount': 1234.56,
+        'is_paid': False,
+        'payment_link': 'no-link',
+        'order_items': [{'product_id': i, 'quantity': (i % 5) + 1} for i in range(1, item_count + 1)],
+        'datetime': str(datetime.now())
+    }
+
+
+def run(item_count=10, iterations=10000):
+    """Print bytes on the wire and encode/decode time per event for each codec"""
+    event = make_event(item_count)
+    print(f"Événement avec {item_count} items, {iterations} itérations")
+    print(f"{'codec':<14}{'octets':>8}{'encode (µs)':>14}{'decode (µs)':>14}")
+    for name in CODEC_NAMES:
+        codec = get_codec(name)
+        payload = codec.encode(event)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            codec.encode(event)
+        encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            codec.decode(payload)
+        decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+        print(f"{name:<14}{len(payload):>8}{encode_us:>14.2f}{decode_us:>14.2f}")
+
+
+if __name__ == '__main__':
+    item_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    run(item_count, iterations)
@@ -0,0 +1,94 @@
+"""
+Redis order read model memory report
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+
+Compare la mémoire occupée par une commande dans Redis (MEMORY USAGE, OBJECT ENCODING)
+entre l'ancien format (items JSON, montant float) et le format compact, puis échantillonne les clés order:* réelles.
+Usage (depuis le répertoire src) : python -m benchmarks.order_memory_report [nombre_de_commandes] [nombre_d_items]
+"""
+import json
+import sys
+from collections import Counter
+from db import get_redis_conn
+from orders.commands.write_order import encode_order
+
+REPORT_KEY_PREFIX = "memory-report"
+SAMPLE_SIZE = 1000
+
+
+def make_order(order_id, item_count):
+    """Build an order similar to the ones written by add_order"""
+    items = [{'product_id': order_id % 1000 + i, 'quantity': (i % 5) + 1} for i in range(item_count)]
+    return {
+        'user_id': order_id % 500 + 1,
+        'total_amount': 1234.56 + order_id,
+        'items': items,
+        'payment_link': 'no-link'
+    }
+
+
+def legacy_mapping(order):
+    """Hash fields as add_order_to_redis wrote them before the compact format"""
+    return {
+        'user_id': order['user_id'],
+        'total_amount': float(order['total_amount']),
+        'items': json.dumps(order['items']),
+        'payment_link': order['payment_link']
+    }
+
+
+def measure(r, keys):
+    """Total bytes and encodings of a list of keys"""
+    pipeline = r.pipeline(transaction=False)
+    for key in keys:
+        pipeline.memory_usage(key, samples=0)
+        pipeline.object('encoding', key)
+    results = pipeline.execute()
+    total_bytes = sum(usage or 0 for usage in results[0::2])
+    encodings = Counter(encoding for encoding in results[1::2] if encoding)
+    return total_bytes, encodings
+
+
+def compare_formats(r, order_count, item_count):
+    """Write the same synthetic orders in both formats, measure them, then clean up"""
+    formats = {'legacy (JSON)': legacy_mapping, 'compact': lambda order: encode_order(**order)}
+    print(f"{order_count} commandes synthétiques de {item_count} items")
+    print(f"{'format':<16}{'octets/commande':>18}{'encodages':>30}")
+    for name, to_mapping in formats.items():
+        prefix = f"{REPORT_KEY_PREFIX}:{name.split()[0]}"
+        keys = [f"{prefix}:{order_id}" for order_id in range(1, order_count + 1)]
+        pipeline = r.pipeline(transaction=False)
+        for order_id, key in enumerate(keys, 1):
+            pipeline.hset(key, mapping=to_mapping(make_order(order_id, item_count)))
+        pipeline.execute()
+        try:
+            total_bytes, encodings = measure(r, keys)
+        finally:
+            r.delete(*keys)
+        print(f"{name:<16}{total_bytes / order_count:>18.1f}{str(dict(encodings)):>30}")
+
+
+def sample_live_orders(r):
+    """Bytes per order and encodings of up to SAMPLE_SIZE real order:* keys"""
+    keys = []
+    for key in r.scan_iter(match="order:*", count=500):
+        keys.append(key)
+        if len(keys) >= SAMPLE_SIZE:
+            break
+    if not keys:
+        print("Aucune clé order:* dans Redis")
+        return
+    total_bytes, encodings = measure(r, keys)
+    print(f"Échantillon de {len(keys)} clés order:* : {total_bytes / len(keys):.1f} octets/commande, encodages {dict(encodings)}")
+
+
+def run(order_count=1000, item_count=3):
+    r = get_redis_conn()
+    compare_formats(r, order_count, item_count)
+    sample_live_orders(r)
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
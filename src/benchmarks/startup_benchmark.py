@@ -0,0 +1,48 @@
+"""
+Cold start benchmark
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+
+Mesure, dans un nouveau processus à chaque fois, le temps d'import de store_manager (qui appelle create_app)
+puis celui de start_services.
+Usage (depuis le répertoire src) : python -m benchmarks.startup_benchmark [iterations] [--with-services]
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import store_manager
+imported = time.perf_counter() - started
+result = {'import_and_create_app': imported}
+if WITH_SERVICES:
+    started = time.perf_counter()
+    store_manager.start_services(store_manager.app)
+    result['start_services'] = time.perf_counter() - started
+print(json.dumps(result))
+"""
+
+
+def measure_once(with_services):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.replace("WITH_SERVICES", str(with_services))],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(iterations=5, with_services=False):
+    """Print the median of each startup phase over several cold starts"""
+    runs = [measure_once(with_services) for _ in range(iterations)]
+    print(f"{iterations} démarrages à froid")
+    for phase in runs[0]:
+        values = [result[phase] for result in runs]
+        print(f"{phase:<24} médiane {statistics.median(values) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 5
+    run(iterations, '--with-services' in sys.argv)
@@ -0,0 +1,165 @@
+"""
+Read-through cache
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+import config
+from db import get_redis_conn
+from logger import Logger
+
+logger = Logger.get_instance("cache")
+
+# Écrit la valeur chargée seulement si la clé n'a pas été invalidée pendant le chargement.
+# KEYS : valeur, version ; ARGV : valeur JSON, TTL, version lue avant le chargement ("" si absente).
+SET_IF_VERSION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[3] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+class ReadThroughCache:
+    """
+    Read-through cache backed by Redis (shared by every instance, with a TTL),
+    optionally fronted by a small in-process LRU (short TTL, so other instances' invalidations are seen quickly).
+    Writers must call invalidate() after changing the underlying data.
+    Each invalidation bumps a version key, and a value loaded from the database is written back only if
+    the version did not change during the load, so a slow reader cannot put back a value older than the invalidation.
+    Redis errors never fail the caller: reads fall back to the loader, invalidations are logged
+    (the stale Redis value then lives at most ttl seconds, the local one at most local_ttl seconds).
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int = config.CACHE_TTL_SECONDS,
+        local_size: int = config.CACHE_LOCAL_SIZE,
+        local_ttl: float = config.CACHE_LOCAL_TTL_SECONDS,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+        self._set_script = None
+
+    def get(self, key, loader):
+        """Get a value from the cache, or load it with loader() and cache it. Empty values are not cached."""
+        value = self._get_local(key)
+        if value is not None:
+            self._increment('local_hits')
+            return value
+
+        redis_key = self._redis_key(key)
+        version_key = self._version_key(key)
+        try:
+            raw_value, version = get_redis_conn().mget(redis_key, version_key)
+        except Exception as e:
+            self._on_error(e)
+            raw_value = version = None
+        if raw_value is not None:
+            value = json.loads(raw_value)
+            self._set_local(key, value)
+            self._increment('redis_hits')
+            return value
+
+        self._increment('misses')
+        value = loader()
+        if value:
+            try:
+                r = get_redis_conn()
+                written = self._get_set_script(r)(
+                    keys=[redis_key, version_key],
+                    args=[json.dumps(value), self.ttl, version or ""],
+                    client=r
+                )
+            except Exception as e:
+                self._on_error(e)
+                written = False
+            # Invalidée pendant le chargement : la valeur est renvoyée mais pas mise en cache
+            if written:
+                self._set_local(key, value)
+        return value
+
+    def invalidate(self, key) -> None:
+        """Remove a value from both cache levels"""
+        self.invalidate_many([key])
+
+    def invalidate_many(self, keys) -> None:
+        """Remove several values from both cache levels, in one Redis round trip"""
+        keys = [str(key) for key in keys]
+        if not keys:
+            return
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+            self._metrics['invalidations'] += len(keys)
+        try:
+            pipeline = get_redis_conn().pipeline(transaction=False)
+            for key in keys:
+                pipeline.incr(self._version_key(key))
+                pipeline.expire(self._version_key(key), self.ttl)
+            pipeline.delete(*[self._redis_key(key) for key in keys])
+            pipeline.execute()
+        except Exception as e:
+            self._on_error(e)
+
+    def get_metrics(self) -> dict:
+        """Hit ratio of the cache (local and Redis hits count as hits)"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['local_size'] = len(self._local)
+        lookups = metrics['local_hits'] + metrics['redis_hits'] + metrics['misses']
+        hits = metrics['local_hits'] + metrics['redis_hits']
+        metrics['hit_ratio'] = round(hits / lookups, 4) if lookups else 0.0
+        return metrics
+
+    def _redis_key(self, key) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def _version_key(self, key) -> str:
+        return f"cache:{self.namespace}:{key}:version"
+
+    def _get_set_script(self, r):
+        if self._set_script is None:
+            self._set_script = r.register_script(SET_IF_VERSION_SCRIPT)
+        return self._set_script
+
+    def _on_error(self, error) -> None:
+        logger.error(f"Cache {self.namespace} indisponible : {error}")
+        self._increment('errors')
+
+    def _get_local(self, key):
+        if self.local_size <= 0:
+            return None
+        with self._lock:
+            entry = self._local.get(str(key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[str(key)]
+                return None
+            self._local.move_to_end(str(key))
+            return value
+
+    def _set_local(self, key, value) -> None:
+        if self.local_size <= 0:
+            return
+        with self._lock:
+            self._local[str(key)] = (time.monotonic() + self.local_ttl, value)
+            self._local.move_to_end(str(key))
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _increment(self, counter) -> None:
+        with self._lock:
+            self._metrics[counter] += 1
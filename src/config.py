@@ -15,6 +15,13 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Pool de connexions SQLAlchemy (partagé par tout le processus)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = int(os.getenv("REDIS_PORT"))
 REDIS_DB = int(os.getenv("REDIS_DB"))
@@ -24,6 +31,97 @@ KAFKA_HOST = os.getenv("KAFKA_HOST")
 KAFKA_TOPIC = os.getenv("KAFKA_TOPIC")
 KAFKA_GROUP_ID = os.getenv("KAFKA_GROUP_ID")
 KAFKA_AUTO_OFFSET_RESET = os.getenv("KAFKA_AUTO_OFFSET_RESET")
+
+# Routage des événements : "single" (tout sur KAFKA_TOPIC) ou "family" (un topic par famille d'événements)
+KAFKA_TOPIC_ROUTING = os.getenv("KAFKA_TOPIC_ROUTING", "single")
+KAFKA_TOPIC_ORDERS = os.getenv("KAFKA_TOPIC_ORDERS", f"{KAFKA_TOPIC}.orders")
+KAFKA_TOPIC_STOCKS = os.getenv("KAFKA_TOPIC_STOCKS", f"{KAFKA_TOPIC}.stocks")
+KAFKA_TOPIC_PAYMENTS = os.getenv("KAFKA_TOPIC_PAYMENTS", f"{KAFKA_TOPIC}.payments")
+KAFKA_TOPIC_SAGA_COMPLETED = os.getenv("KAFKA_TOPIC_SAGA_COMPLETED", f"{KAFKA_TOPIC}.saga-completed")
+
+# Kafka Producer : en mode asynchrone, on s'appuie sur linger/batch au lieu de flush() à chaque envoi
+KAFKA_PRODUCER_ASYNC = os.getenv("KAFKA_PRODUCER_ASYNC", "true").lower() == "true"
+KAFKA_PRODUCER_LINGER_MS = int(os.getenv("KAFKA_PRODUCER_LINGER_MS", "5"))
+KAFKA_PRODUCER_BATCH_SIZE = int(os.getenv("KAFKA_PRODUCER_BATCH_SIZE", "16384"))
+KAFKA_PRODUCER_COMPRESSION_TYPE = os.getenv("KAFKA_PRODUCER_COMPRESSION_TYPE", "none")
+KAFKA_PRODUCER_ACKS = os.getenv("KAFKA_PRODUCER_ACKS", "1")
+KAFKA_PRODUCER_SEND_TIMEOUT = int(os.getenv("KAFKA_PRODUCER_SEND_TIMEOUT", "10"))
+
+# Encodage des événements envoyés : json, msgpack, json+zlib ou msgpack+zlib (le consommateur lit le header du message)
+KAFKA_EVENT_CODEC = os.getenv("KAFKA_EVENT_CODEC", "json")
+
+# Kafka Consumer : les événements sont répartis par order_id sur un pool de workers
+KAFKA_CONSUMER_WORKERS = int(os.getenv("KAFKA_CONSUMER_WORKERS", "4"))
+KAFKA_CONSUMER_QUEUE_SIZE = int(os.getenv("KAFKA_CONSUMER_QUEUE_SIZE", "100"))
+KAFKA_MAX_POLL_RECORDS = int(os.getenv("KAFKA_MAX_POLL_RECORDS", "100"))
+KAFKA_POLL_TIMEOUT_MS = int(os.getenv("KAFKA_POLL_TIMEOUT_MS", "1000"))
+# Un handler en échec est relancé (attente doublée à chaque essai), puis l'événement part dans le topic dead-letter
+KAFKA_HANDLER_MAX_RETRIES = int(os.getenv("KAFKA_HANDLER_MAX_RETRIES", "3"))
+KAFKA_HANDLER_RETRY_BACKOFF = float(os.getenv("KAFKA_HANDLER_RETRY_BACKOFF", "0.5"))
+KAFKA_DEAD_LETTER_TOPIC = os.getenv("KAFKA_DEAD_LETTER_TOPIC", f"{KAFKA_TOPIC}.dead-letter")
+
+# Relais Outbox : traite les paiements en attente par lots, en continu
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+OUTBOX_MAX_WORKERS = int(os.getenv("OUTBOX_MAX_WORKERS", "8"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "3"))
+# Durée après laquelle un élément réservé par un relais arrêté peut être repris (en secondes)
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv("OUTBOX_CLAIM_TIMEOUT", "120"))
+# Le nombre d'éléments en attente affiché par /metrics est recalculé au plus une fois par intervalle (en secondes)
+OUTBOX_BACKLOG_REFRESH_INTERVAL = float(os.getenv("OUTBOX_BACKLOG_REFRESH_INTERVAL", "10"))
+# Rétention : les éléments traités depuis plus de X heures sont déplacés vers outbox_archive
+OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+OUTBOX_RETENTION_BATCH_SIZE = int(os.getenv("OUTBOX_RETENTION_BATCH_SIZE", "500"))
+OUTBOX_RETENTION_INTERVAL = float(os.getenv("OUTBOX_RETENTION_INTERVAL", "300"))
+
+# Client HTTP de l'API Payments (via la gateway)
+PAYMENTS_API_URL = os.getenv("PAYMENTS_API_URL", "http://api-gateway:8080/payments-api")
+PAYMENTS_API_CONNECT_TIMEOUT = float(os.getenv("PAYMENTS_API_CONNECT_TIMEOUT", "2"))
+PAYMENTS_API_READ_TIMEOUT = float(os.getenv("PAYMENTS_API_READ_TIMEOUT", "10"))
+PAYMENTS_API_MAX_RETRIES = int(os.getenv("PAYMENTS_API_MAX_RETRIES", "3"))
+PAYMENTS_API_BACKOFF = float(os.getenv("PAYMENTS_API_BACKOFF", "0.2"))
+PAYMENTS_API_POOL_SIZE = int(os.getenv("PAYMENTS_API_POOL_SIZE", "10"))
+
+# Cache des documents GraphQL (requêtes déjà analysées et validées)
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "128"))
+
+# Création de commandes en lot (POST /orders/batch)
+ORDER_BATCH_MAX_SIZE = int(os.getenv("ORDER_BATCH_MAX_SIZE", "1000"))
+
+# Rétention des commandes dans Redis, en secondes (0 = jamais) ; au-delà, elles sont relues depuis MySQL
+ORDER_REDIS_TTL_SECONDS = int(os.getenv("ORDER_REDIS_TTL_SECONDS", "604800"))
+ORDER_REDIS_PAID_TTL_SECONDS = int(os.getenv("ORDER_REDIS_PAID_TTL_SECONDS", "86400"))
+
+# Import en lot du catalogue (lignes par transaction)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+# Préchargement du cache des stocks au démarrage
+CACHE_WARMUP_CHUNK_SIZE = int(os.getenv("CACHE_WARMUP_CHUNK_SIZE", "1000"))
+CACHE_WARMUP_RETRY_INTERVAL = float(os.getenv("CACHE_WARMUP_RETRY_INTERVAL", "2"))
+# Attente maximale du préchargement par le maître Gunicorn, en secondes (0 = sans limite)
+CACHE_WARMUP_TIMEOUT = float(os.getenv("CACHE_WARMUP_TIMEOUT", "120"))
+
+# Durée de vie des marqueurs de réservation du stock dans Redis (reservation:<order_id>)
+STOCK_RESERVATION_TTL_SECONDS = int(os.getenv("STOCK_RESERVATION_TTL_SECONDS", "604800"))
+
+# Cache de lecture des produits et utilisateurs (Redis, puis petit cache local en mémoire)
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_LOCAL_SIZE = int(os.getenv("CACHE_LOCAL_SIZE", "1024"))
+CACHE_LOCAL_TTL_SECONDS = float(os.getenv("CACHE_LOCAL_TTL_SECONDS", "5"))
+
+# Services démarrés en arrière-plan par start_services (séparés par des virgules)
+BACKGROUND_SERVICES = os.getenv("BACKGROUND_SERVICES", "warmup,outbox,outbox_retention,consumer")
+
+# Mode du serveur : "development" (serveur Flask, un processus), "gunicorn" (plusieurs processus)
+# ou "services" (services d'arrière-plan seulement, sans serveur HTTP)
+SERVER_MODE = os.getenv("SERVER_MODE", "development")
+GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", "4"))
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "4"))
+GUNICORN_TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+# Workers Gunicorn qui démarrent les services d'arrière-plan : "one", "all" ou "none" (processus SERVER_MODE=services)
+GUNICORN_SERVICES_WORKERS = os.getenv("GUNICORN_SERVICES_WORKERS", "one")
+GUNICORN_SERVICES_LOCK_FILE = os.getenv("GUNICORN_SERVICES_LOCK_FILE", "/tmp/store_manager_services.lock")
+
 LOG_LEVEL = os.getenv("LOG_LEVEL")
 
 for env_variable in ["DB_HOST", "DB_PORT","DB_NAME","DB_USER","DB_PASSWORD","REDIS_HOST","REDIS_PORT","REDIS_DB","KAFKA_HOST", "KAFKA_TOPIC", "KAFKA_GROUP_ID", "KAFKA_AUTO_OFFSET_RESET", "LOG_LEVEL"]:
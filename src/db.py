@@ -4,15 +4,24 @@ SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
+import threading
 import mysql.connector
 import redis
 import config
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 
-# optimization: on utilise un pool de connections
+# optimization: on utilise un pool de connections, créé à la première utilisation
 # https://redis.io/docs/latest/develop/clients/pools-and-muxing/
-pool = redis.ConnectionPool(host=config.REDIS_HOST, port=config.REDIS_PORT, db=config.REDIS_DB, decode_responses=True)
+_redis_pool = None
+_redis_pool_lock = threading.Lock()
+
+# optimization: un seul engine SQLAlchemy (et donc un seul pool de connexions) par processus
+# https://docs.sqlalchemy.org/en/20/core/pooling.html
+_engine = None
+_engine_lock = threading.Lock()
+Session = sessionmaker()
+ScopedSession = scoped_session(Session)
 
 def get_mysql_conn():
     """Get a MySQL connection using env variables"""
@@ -25,13 +34,77 @@ def get_mysql_conn():
         auth_plugin='caching_sha2_password'
     )
 
+def get_redis_pool():
+    """Get the process-wide Redis connection pool, creating it on first use"""
+    global _redis_pool
+    if _redis_pool is None:
+        with _redis_pool_lock:
+            if _redis_pool is None:
+                _redis_pool = redis.ConnectionPool(host=config.REDIS_HOST, port=config.REDIS_PORT, db=config.REDIS_DB, decode_responses=True)
+    return _redis_pool
+
 def get_redis_conn():
     """Get a Redis connection using env variables"""
-    return redis.Redis(connection_pool=pool, decode_responses=True)
+    return redis.Redis(connection_pool=get_redis_pool(), decode_responses=True)
+
+def get_engine():
+    """Get the process-wide SQLAlchemy engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                connection_string = f'mysql+mysqlconnector://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}'
+                _engine = create_engine(
+                    connection_string,
+                    connect_args={'auth_plugin': 'caching_sha2_password'},
+                    pool_size=config.DB_POOL_SIZE,
+                    max_overflow=config.DB_POOL_MAX_OVERFLOW,
+                    pool_timeout=config.DB_POOL_TIMEOUT,
+                    pool_recycle=config.DB_POOL_RECYCLE,
+                    pool_pre_ping=config.DB_POOL_PRE_PING
+                )
+                Session.configure(bind=_engine)
+    return _engine
 
 def get_sqlalchemy_session():
-    """Get an SQLAlchemy ORM session using env variables"""
-    connection_string = f'mysql+mysqlconnector://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}'
-    engine = create_engine(connection_string, connect_args={'auth_plugin': 'caching_sha2_password'})
-    Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+    """Get a new SQLAlchemy ORM session bound to the shared engine. The caller must close it."""
+    get_engine()
+    return Session()
+
+def get_scoped_session():
+    """Get the SQLAlchemy ORM session of the current scope (Flask request or Kafka handler invocation)"""
+    get_engine()
+    return ScopedSession()
+
+def remove_scoped_session(exception=None):
+    """Close the session of the current scope and give its connection back to the pool"""
+    ScopedSession.remove()
+
+def reset_connections(in_child_process=False):
+    """
+    Drop the pooled MySQL and Redis connections, so that new ones are opened on next use.
+    In a freshly forked worker, the inherited sockets still belong to the parent process:
+    they are forgotten without being closed (in_child_process=True).
+    """
+    global _redis_pool
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=not in_child_process)
+    with _redis_pool_lock:
+        if _redis_pool is not None and not in_child_process:
+            _redis_pool.disconnect()
+        _redis_pool = None
+
+def get_pool_stats():
+    """Get statistics of the SQLAlchemy connection pool"""
+    if _engine is None:
+        return {'initialized': False}
+    engine_pool = _engine.pool
+    return {
+        'initialized': True,
+        'size': engine_pool.size(),
+        'checked_in': engine_pool.checkedin(),
+        'checked_out': engine_pool.checkedout(),
+        'overflow': engine_pool.overflow(),
+        'max_overflow': config.DB_POOL_MAX_OVERFLOW
+    }
@@ -0,0 +1,107 @@
+"""
+Event codecs
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import json
+import zlib
+from functools import lru_cache
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import msgpack
+
+# Headers Kafka qui décrivent l'encodage du message. Un message sans header est du JSON (ancien format).
+CODEC_HEADER = "event-codec"
+CODEC_VERSION_HEADER = "event-codec-version"
+CODEC_VERSION = 1
+# Versions du format que ce consommateur sait lire (un message sans version est de la version 1)
+SUPPORTED_CODEC_VERSIONS = (1,)
+
+class EventCodec(ABC):
+    """Base class for all event codecs"""
+
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, event_data: Dict[str, Any]) -> bytes:
+        """Encode an event to bytes"""
+        pass
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        """Decode bytes to an event"""
+        pass
+
+    def get_headers(self) -> List[Tuple[str, bytes]]:
+        """Get the Kafka headers describing this codec"""
+        return [
+            (CODEC_HEADER, self.name.encode("utf-8")),
+            (CODEC_VERSION_HEADER, str(CODEC_VERSION).encode("utf-8")),
+        ]
+
+class JsonCodec(EventCodec):
+    """JSON without whitespace"""
+
+    name = "json"
+
+    def encode(self, event_data: Dict[str, Any]) -> bytes:
+        return json.dumps(event_data, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        return json.loads(payload.decode("utf-8"))
+
+class MsgpackCodec(EventCodec):
+    """MessagePack binary encoding"""
+
+    name = "msgpack"
+
+    def encode(self, event_data: Dict[str, Any]) -> bytes:
+        return msgpack.packb(event_data, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(payload, raw=False)
+
+class ZlibCodec(EventCodec):
+    """Compress the payload of another codec with zlib"""
+
+    def __init__(self, inner: EventCodec, level: int = 6):
+        self.inner = inner
+        self.level = level
+        self.name = f"{inner.name}+zlib"
+
+    def encode(self, event_data: Dict[str, Any]) -> bytes:
+        return zlib.compress(self.inner.encode(event_data), self.level)
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        return self.inner.decode(zlib.decompress(payload))
+
+_BASE_CODECS = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+@lru_cache(maxsize=None)
+def get_codec(name: str) -> EventCodec:
+    """Get a codec by name: json, msgpack, json+zlib or msgpack+zlib"""
+    base_name, _, compression = name.partition("+")
+    if base_name not in _BASE_CODECS or compression not in ("", "zlib"):
+        raise ValueError(f"Codec inconnu : {name}")
+    codec = _BASE_CODECS[base_name]()
+    return ZlibCodec(codec) if compression == "zlib" else codec
+
+def decode_event(payload: bytes, headers: Optional[List[Tuple[str, bytes]]] = None) -> Dict[str, Any]:
+    """
+    Decode a Kafka message with the codec named in its headers (JSON when there is none).
+    Raise ValueError if the message was written with a codec version this consumer does not support.
+    """
+    codec_name = JsonCodec.name
+    codec_version = "1"
+    for key, value in headers or []:
+        if key == CODEC_HEADER and value:
+            codec_name = value.decode("utf-8")
+        elif key == CODEC_VERSION_HEADER and value:
+            codec_version = value.decode("utf-8")
+    if not codec_version.isdigit() or int(codec_version) not in SUPPORTED_CODEC_VERSIONS:
+        raise ValueError(f"Version de codec non supportée : {codec_version} (codec {codec_name})")
+    return get_codec(codec_name).decode(payload)
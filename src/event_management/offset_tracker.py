@@ -0,0 +1,79 @@
+"""
+Offset tracker
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import threading
+from typing import Dict, Iterable, Set
+from kafka.structs import OffsetAndMetadata, TopicPartition
+
+class OffsetTracker:
+    """
+    Keeps track of the messages dispatched to the workers, per partition.
+    Workers can finish out of order, so the offset we can commit is the lowest offset still in flight
+    (or the offset after the last dispatched message when nothing is in flight). This gives at-least-once delivery.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._pending: Dict[TopicPartition, Set[int]] = {}
+        self._next_offset: Dict[TopicPartition, int] = {}
+        self._committed: Dict[TopicPartition, int] = {}
+
+    def track(self, topic_partition: TopicPartition, offset: int) -> None:
+        """Register a message that was just dispatched"""
+        with self._lock:
+            self._pending.setdefault(topic_partition, set()).add(offset)
+            self._next_offset[topic_partition] = max(self._next_offset.get(topic_partition, 0), offset + 1)
+
+    def done(self, topic_partition: TopicPartition, offset: int) -> None:
+        """Register a message whose handler has finished (successfully or not)"""
+        with self._condition:
+            pending = self._pending.get(topic_partition)
+            if pending is not None:
+                pending.discard(offset)
+            self._condition.notify_all()
+
+    def committable(self, partitions: Iterable[TopicPartition] = None) -> Dict[TopicPartition, OffsetAndMetadata]:
+        """Get the offsets that can be committed and were not committed yet"""
+        with self._lock:
+            offsets = {}
+            for topic_partition in (partitions if partitions is not None else list(self._next_offset)):
+                if topic_partition not in self._next_offset:
+                    continue
+                pending = self._pending.get(topic_partition)
+                offset = min(pending) if pending else self._next_offset[topic_partition]
+                if self._committed.get(topic_partition) != offset:
+                    offsets[topic_partition] = OffsetAndMetadata(offset, "", -1)
+            return offsets
+
+    def mark_committed(self, offsets: Dict[TopicPartition, OffsetAndMetadata]) -> None:
+        """Remember what was committed, to avoid committing the same offsets again"""
+        with self._lock:
+            for topic_partition, offset_and_metadata in offsets.items():
+                self._committed[topic_partition] = offset_and_metadata.offset
+
+    def wait_until_done(
+        self,
+        partitions: Iterable[TopicPartition],
+        timeout: float,
+        excluding: Dict[TopicPartition, Set[int]] = None
+    ) -> bool:
+        """Wait until no message of the given partitions is in flight, except the excluded offsets (never dispatched to a worker)"""
+        partitions = list(partitions)
+        excluding = excluding or {}
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not any(self._pending.get(tp, set()) - excluding.get(tp, set()) for tp in partitions),
+                timeout=timeout
+            )
+
+    def forget(self, partitions: Iterable[TopicPartition]) -> None:
+        """Drop the state of partitions that are no longer assigned to this consumer"""
+        with self._lock:
+            for topic_partition in partitions:
+                self._pending.pop(topic_partition, None)
+                self._next_offset.pop(topic_partition, None)
+                self._committed.pop(topic_partition, None)
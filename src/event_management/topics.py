@@ -0,0 +1,43 @@
+"""
+Event topics
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+from typing import Any, Dict, Iterable, List
+import config
+
+# Famille de chaque type d'événement de la saga
+EVENT_FAMILIES = {
+    "OrderCreated": "orders",
+    "OrderCreationFailed": "orders",
+    "OrderCancelled": "orders",
+    "StockDecreased": "stocks",
+    "StockDecreaseFailed": "stocks",
+    "StockIncreased": "stocks",
+    "PaymentCreated": "payments",
+    "PaymentCreationFailed": "payments",
+    "SagaCompleted": "saga-completed",
+}
+
+FAMILY_TOPICS = {
+    "orders": config.KAFKA_TOPIC_ORDERS,
+    "stocks": config.KAFKA_TOPIC_STOCKS,
+    "payments": config.KAFKA_TOPIC_PAYMENTS,
+    "saga-completed": config.KAFKA_TOPIC_SAGA_COMPLETED,
+}
+
+def get_topic_for_event_type(event_type: str) -> str:
+    """Get the topic where an event type is published"""
+    if config.KAFKA_TOPIC_ROUTING != "family":
+        return config.KAFKA_TOPIC
+    family = EVENT_FAMILIES.get(event_type)
+    return FAMILY_TOPICS.get(family, config.KAFKA_TOPIC)
+
+def get_event_topic(event_data: Dict[str, Any]) -> str:
+    """Get the topic where an event is published"""
+    return get_topic_for_event_type(event_data.get('event'))
+
+def get_topics_for_event_types(event_types: Iterable[str]) -> List[str]:
+    """Get the topics to subscribe to in order to receive the given event types"""
+    return sorted({get_topic_for_event_type(event_type) for event_type in event_types})
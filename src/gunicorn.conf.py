@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration (SERVER_MODE=gunicorn)
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+
+Usage (depuis le répertoire src) : gunicorn -c gunicorn.conf.py store_manager:app
+"""
+import config
+
+bind = "0.0.0.0:5000"
+workers = config.GUNICORN_WORKERS
+threads = config.GUNICORN_THREADS
+worker_class = "gthread"
+timeout = config.GUNICORN_TIMEOUT
+# L'application est importée une seule fois dans le processus maître, puis partagée par fork
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Warm the stock cache once, in the master, before any worker is forked (every worker is then ready at once).
+    If it takes longer than CACHE_WARMUP_TIMEOUT, the workers are started anyway and finish the warm-up themselves.
+    """
+    from store_manager import get_background_services, warm_up_before_fork
+    if 'warmup' in get_background_services():
+        warm_up_before_fork()
+
+
+def post_fork(server, worker):
+    """Rebuild the connections, producers and consumers of the new worker, then start its background services"""
+    from store_manager import app, get_worker_services, reset_after_fork, start_services
+    reset_after_fork()
+    start_services(app, get_worker_services())
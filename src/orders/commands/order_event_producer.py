@@ -3,12 +3,18 @@ Order event producer
 SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
-import json
+import atexit
+import threading
+import time
 from kafka import KafkaProducer
-from kafka.errors import NoBrokersAvailable
+from kafka.errors import KafkaError, NoBrokersAvailable
 import config
 from logger import Logger
 from singleton import Singleton
+from event_management.codecs import get_codec
+
+# Délai avant une nouvelle tentative de connexion si Kafka est indisponible (en secondes)
+PRODUCER_RETRY_INTERVAL = 10
 
 
 class OrderEventProducer(metaclass=Singleton):
@@ -17,34 +23,136 @@ class OrderEventProducer(metaclass=Singleton):
     def __init__(self):
         self.logger = Logger.get_instance("OrderEventProducer")
         self.producer = None
-        try:
-            self.producer = KafkaProducer(
-                bootstrap_servers=config.KAFKA_HOST,
-                value_serializer=lambda v: json.dumps(v).encode("utf-8")
-            )
-            self.logger.debug(f"KafkaProducer initialisé sur {config.KAFKA_HOST}")
-        except NoBrokersAvailable as e:
-            self.logger.error(f"Kafka indisponible à l'initialisation : {e}")
-            self.producer = None
-        except Exception as e:
-            self.logger.error(f"Erreur à l'initialisation de KafkaProducer : {e}")
-            self.producer = None
+        self.codec = get_codec(config.KAFKA_EVENT_CODEC)
+        self._producer_lock = threading.Lock()
+        self._next_connect_attempt = 0.0
+        self._atexit_registered = False
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'sent': 0, 'delivered': 0, 'failed': 0, 'last_error': None}
+
+    def _get_producer(self):
+        """
+        Create the KafkaProducer on first use rather than at import/construction time,
+        so that importing the application (tests, scripts) does not connect to the broker.
+        If Kafka is unavailable, the next attempt is made after PRODUCER_RETRY_INTERVAL seconds.
+        """
+        if self.producer is not None:
+            return self.producer
+        with self._producer_lock:
+            if self.producer is not None or time.monotonic() < self._next_connect_attempt:
+                return self.producer
+            try:
+                self.producer = KafkaProducer(
+                    bootstrap_servers=config.KAFKA_HOST,
+                    value_serializer=self.codec.encode,
+                    key_serializer=lambda k: str(k).encode("utf-8") if k is not None else None,
+                    linger_ms=config.KAFKA_PRODUCER_LINGER_MS,
+                    batch_size=config.KAFKA_PRODUCER_BATCH_SIZE,
+                    compression_type=self._get_compression_type(),
+                    acks=self._get_acks()
+                )
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+                self.logger.debug(f"KafkaProducer initialisé sur {config.KAFKA_HOST}")
+            except NoBrokersAvailable as e:
+                self.logger.error(f"Kafka indisponible à l'initialisation : {e}")
+                self._next_connect_attempt = time.monotonic() + PRODUCER_RETRY_INTERVAL
+            except Exception as e:
+                self.logger.error(f"Erreur à l'initialisation de KafkaProducer : {e}")
+                self._next_connect_attempt = time.monotonic() + PRODUCER_RETRY_INTERVAL
+            return self.producer
+
+    def reset_after_fork(self):
+        """
+        Forget the producer inherited from the parent process: its I/O thread does not survive fork.
+        A new producer is created by the worker on its first send.
+        """
+        self.producer = None
+        self._producer_lock = threading.Lock()
+        self._next_connect_attempt = 0.0
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'sent': 0, 'delivered': 0, 'failed': 0, 'last_error': None}
 
     def get_instance(self):
         """Conserve la compatibilité avec le pattern Singleton utilisé ailleurs."""
         return self
 
-    def send(self, topic: str, value: dict):
-        """Envoie un événement sur Kafka, ou loggue simplement si Kafka est indisponible."""
-        if self.producer is None:
+    def send(self, topic: str, value: dict, durable: bool = False, key=None):
+        """
+        Envoie un événement sur Kafka, ou loggue simplement si Kafka est indisponible.
+        La clé de partition est l'order_id par défaut : tous les événements d'une commande vont sur la même partition.
+        En mode asynchrone, l'envoi part avec le prochain batch et le résultat est compté par les callbacks.
+        Avec durable=True (ou en mode synchrone), on attend l'accusé de réception du broker.
+        Retourne True si l'événement est parti (ou confirmé), False sinon ;
+        avec durable=True, un échec lève une exception au lieu d'être seulement loggué.
+        """
+        producer = self._get_producer()
+        if producer is None:
+            if durable:
+                raise KafkaError(f"KafkaProducer non initialisé, événement non envoyé. topic={topic}")
             self.logger.warning(
                 f"KafkaProducer non initialisé, événement ignoré. topic={topic}, value={value}"
             )
-            return
+            return False
 
         try:
-            self.producer.send(topic, value=value)
-            self.producer.flush()
+            if key is None:
+                key = value.get('order_id')
+            future = producer.send(topic, value=value, key=key, headers=self.codec.get_headers())
+            self._increment('sent')
+            future.add_callback(self._on_send_success)
+            future.add_errback(self._on_send_error)
+            if durable or not config.KAFKA_PRODUCER_ASYNC:
+                future.get(timeout=config.KAFKA_PRODUCER_SEND_TIMEOUT)
             self.logger.debug(f"Événement envoyé sur Kafka topic={topic} : {value}")
+            return True
         except Exception as e:
             self.logger.error(f"Erreur lors de l'envoi vers Kafka : {e}")
+            if durable:
+                raise
+            return False
+
+    def flush(self, timeout=None):
+        """Attend que tous les événements en attente soient envoyés"""
+        if self.producer is not None:
+            self.producer.flush(timeout=timeout)
+
+    def close(self):
+        """Envoie les événements en attente puis ferme le producteur (à l'arrêt de l'application)"""
+        if self.producer is not None:
+            try:
+                self.producer.flush(timeout=config.KAFKA_PRODUCER_SEND_TIMEOUT)
+                self.producer.close(timeout=config.KAFKA_PRODUCER_SEND_TIMEOUT)
+            except Exception as e:
+                self.logger.error(f"Erreur à la fermeture de KafkaProducer : {e}")
+            self.producer = None
+
+    def get_metrics(self):
+        """Compteurs d'envoi (envoyés, confirmés, échoués)"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['pending'] = metrics['sent'] - metrics['delivered'] - metrics['failed']
+        metrics['async'] = config.KAFKA_PRODUCER_ASYNC
+        return metrics
+
+    def _on_send_success(self, record_metadata):
+        self._increment('delivered')
+
+    def _on_send_error(self, exception):
+        self.logger.error(f"Échec de livraison d'un événement Kafka : {exception}")
+        with self._metrics_lock:
+            self._metrics['failed'] += 1
+            self._metrics['last_error'] = str(exception)
+
+    def _increment(self, counter):
+        with self._metrics_lock:
+            self._metrics[counter] += 1
+
+    def _get_compression_type(self):
+        compression_type = config.KAFKA_PRODUCER_COMPRESSION_TYPE.lower()
+        return None if compression_type in ("", "none") else compression_type
+
+    def _get_acks(self):
+        acks = config.KAFKA_PRODUCER_ACKS.lower()
+        return acks if acks == "all" else int(acks)
@@ -0,0 +1,72 @@
+"""
+Orders reports aggregates (rebuild from MySQL)
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+
+Usage (depuis le répertoire src) : python -m orders.commands.rebuild_reports
+"""
+from sqlalchemy.sql import func
+from logger import Logger
+from db import get_redis_conn, get_sqlalchemy_session
+from orders.commands.write_order import HIGHEST_SPENDERS_KEY, BEST_SELLERS_KEY, to_cents
+from orders.models.order import Order
+from orders.models.order_item import OrderItem
+
+logger = Logger.get_instance("rebuild_reports")
+
+
+def _replace_sorted_set(r, key, scores):
+    """Write scores to a temporary key, then swap it with the live key in one atomic RENAME"""
+    tmp_key = f"{key}:rebuild"
+    pipeline = r.pipeline(transaction=True)
+    pipeline.delete(tmp_key)
+    if scores:
+        pipeline.zadd(tmp_key, scores)
+        pipeline.rename(tmp_key, key)
+    else:
+        pipeline.delete(key)
+    pipeline.execute()
+
+
+def rebuild_highest_spenders():
+    """Regenerate the highest spenders aggregate from the orders table in MySQL"""
+    session = get_sqlalchemy_session()
+    try:
+        results = session.query(
+            Order.user_id,
+            func.sum(Order.total_amount).label('total_expense')
+        ).group_by(Order.user_id).all()
+        scores = {str(row.user_id): to_cents(row.total_expense) for row in results}
+    finally:
+        session.close()
+
+    _replace_sorted_set(get_redis_conn(), HIGHEST_SPENDERS_KEY, scores)
+    logger.info(f"Agrégat {HIGHEST_SPENDERS_KEY} reconstruit : {len(scores)} utilisateurs")
+    return len(scores)
+
+
+def rebuild_best_sellers():
+    """Regenerate the best sellers index from the order_items table in MySQL"""
+    session = get_sqlalchemy_session()
+    try:
+        results = session.query(
+            OrderItem.product_id,
+            func.sum(OrderItem.quantity).label('total_sold')
+        ).group_by(OrderItem.product_id).all()
+        scores = {str(row.product_id): int(row.total_sold) for row in results}
+    finally:
+        session.close()
+
+    _replace_sorted_set(get_redis_conn(), BEST_SELLERS_KEY, scores)
+    logger.info(f"Agrégat {BEST_SELLERS_KEY} reconstruit : {len(scores)} produits")
+    return len(scores)
+
+
+def rebuild_all():
+    """Regenerate every report aggregate from MySQL"""
+    rebuild_highest_spenders()
+    rebuild_best_sellers()
+
+
+if __name__ == '__main__':
+    rebuild_all()
@@ -9,14 +9,20 @@ import requests
 import config
 from logger import Logger
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
 from orders.models.order import Order
 from stocks.models.product import Product
+from sqlalchemy import insert
 from sqlalchemy.exc import SQLAlchemyError
 from orders.models.order_item import OrderItem
 from db import get_sqlalchemy_session, get_redis_conn
 
 logger = Logger.get_instance("add_order")
 
+# Agrégats des rapports, tenus à jour à chaque écriture de commande dans Redis
+HIGHEST_SPENDERS_KEY = "report:highest_spenders"
+BEST_SELLERS_KEY = "report:best_sellers"
+
 
 def add_order(user_id: int, items: list):
     """Insert order with items in MySQL, keep Redis in sync"""
@@ -29,26 +35,8 @@ def add_order(user_id: int, items: list):
         product_ids = [item['product_id'] for item in items]
 
         logger.debug("Commencer : ajout de commande")
-        products_query = session.query(Product).filter(Product.id.in_(product_ids)).all()
-        price_map = {product.id: product.price for product in products_query}
-        total_amount = 0
-        order_items = []
-
-        for item in items:
-            pid = item["product_id"]
-            qty = item["quantity"]
-
-            if pid not in price_map:
-                raise ValueError(f"Product ID {pid} not found in database.")
-
-            unit_price = price_map[pid]
-            total_amount += unit_price * qty
-
-            order_items.append({
-                'product_id': pid,
-                'quantity': qty,
-                'unit_price': unit_price
-            })
+        price_map = _get_price_map(session, product_ids)
+        total_amount, order_items = _price_order_items(items, price_map)
 
         # Au départ, pas de lien de paiement : généré plus tard par PaymentCreatedHandler
         new_order = Order(user_id=user_id, total_amount=total_amount, payment_link="no-link")
@@ -88,10 +76,135 @@ def add_order(user_id: int, items: list):
         session.rollback()
         raise e
     finally:
-        OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+        OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
         session.close()
 
 
+def add_orders(orders: list):
+    """
+    Insert many orders at once: one price lookup for every product, one transaction,
+    a bulk insert of the items, one Redis pipeline and one Kafka batch.
+    Returns one result per order, in the same order ({'order_id': ...} or {'error': ...}).
+    """
+    results = [None] * len(orders)
+    valid = []
+    events = []
+    session = get_sqlalchemy_session()
+    try:
+        # Une commande mal formée échoue seule : seules les commandes bien formées alimentent la recherche de prix
+        candidates = []
+        for index, order in enumerate(orders):
+            try:
+                candidates.append((index, order['user_id'], _validate_order_items(order)))
+            except (ValueError, KeyError, TypeError) as e:
+                results[index] = {'error': str(e)}
+        price_map = _get_price_map(session, {
+            item['product_id'] for _, _, items in candidates for item in items
+        })
+
+        for index, user_id, items in candidates:
+            try:
+                total_amount, order_items = _price_order_items(items, price_map)
+                valid.append((index, user_id, items, total_amount, order_items))
+            except (ValueError, KeyError, TypeError) as e:
+                results[index] = {'error': str(e)}
+
+        if valid:
+            # MySQL n'a pas de RETURNING : l'ORM insère les commandes une à une pour récupérer leurs ids,
+            # mais tout se fait dans une seule transaction. Les articles partent en un seul INSERT multi-lignes.
+            new_orders = [
+                Order(user_id=user_id, total_amount=total_amount, payment_link="no-link")
+                for _, user_id, _, total_amount, _ in valid
+            ]
+            session.add_all(new_orders)
+            session.flush()
+            # Les ids sont lus avant le commit, qui expire les objets (sinon un SELECT par commande)
+            order_ids = [new_order.id for new_order in new_orders]
+            session.execute(insert(OrderItem), [
+                {**item, 'order_id': order_id}
+                for order_id, (_, _, _, _, order_items) in zip(order_ids, valid)
+                for item in order_items
+            ])
+            session.commit()
+            logger.debug(f"{len(order_ids)} commandes ont été ajoutées")
+
+            pipeline = get_redis_conn().pipeline(transaction=True)
+            for order_id, (index, user_id, items, total_amount, _) in zip(order_ids, valid):
+                add_order_to_redis(order_id, user_id, total_amount, items, payment_link="no-link", pipeline=pipeline)
+                results[index] = {'order_id': order_id}
+                events.append({
+                    'event': 'OrderCreated',
+                    'order_id': order_id,
+                    'user_id': user_id,
+                    'total_amount': total_amount,
+                    'is_paid': False,
+                    'payment_link': "no-link",
+                    'order_items': items,
+                    'datetime': str(datetime.now())
+                })
+            pipeline.execute()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erreur lors de l'ajout des commandes en lot : {e}")
+        # Les commandes déjà validées en base restent créées, les autres échouent toutes ensemble
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = {'error': str(e)}
+    finally:
+        session.close()
+
+    for result in results:
+        if 'error' in result:
+            events.append({'event': 'OrderCreationFailed', 'error': result['error']})
+    producer = OrderEventProducer().get_instance()
+    for event_data in events:
+        producer.send(get_event_topic(event_data), value=event_data)
+    producer.flush(timeout=config.KAFKA_PRODUCER_SEND_TIMEOUT)
+    return results
+
+
+def _validate_order_items(order):
+    """Check the shape of one order of a batch and return its items"""
+    if not isinstance(order, dict) or not order.get('user_id'):
+        raise ValueError("Cannot create order. An order must have a user_id.")
+    items = order.get('items') or []
+    if not isinstance(items, list) or not items:
+        raise ValueError("Cannot create order. An order must have 1 or more items.")
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('product_id'), int) or not isinstance(item.get('quantity'), int):
+            raise ValueError(f"Cannot create order. Invalid item: {item}")
+    return items
+
+
+def _get_price_map(session, product_ids):
+    """Get the price of every product in a single query"""
+    products = session.query(Product.id, Product.price).filter(Product.id.in_(list(product_ids))).all()
+    return {product.id: product.price for product in products}
+
+
+def _price_order_items(items, price_map):
+    """Compute the total amount and the order item rows, failing if a product does not exist"""
+    total_amount = 0
+    order_items = []
+
+    for item in items:
+        pid = item["product_id"]
+        qty = item["quantity"]
+
+        if pid not in price_map:
+            raise ValueError(f"Product ID {pid} not found in database.")
+
+        unit_price = price_map[pid]
+        total_amount += unit_price * qty
+
+        order_items.append({
+            'product_id': pid,
+            'quantity': qty,
+            'unit_price': unit_price
+        })
+    return total_amount, order_items
+
+
 def modify_order(order_id: int, is_paid: bool, payment_link: str) -> bool:
     """Update order fields (is_paid, payment_link) in DB and keep Redis in sync"""
     session = get_sqlalchemy_session()
@@ -109,11 +222,7 @@ def modify_order(order_id: int, is_paid: bool, payment_link: str) -> bool:
             f"Order {order_id} updated: is_paid={order.is_paid}, payment_link={order.payment_link}"
         )
 
-        r = get_redis_conn()
-        key = f"order:{order_id}"
-        if r.exists(key):
-            r.hset(key, mapping={"payment_link": payment_link, "is_paid": int(is_paid)})
-
+        update_order_in_redis(order_id, payment_link, is_paid)
         return True
     except Exception as e:
         session.rollback()
@@ -129,11 +238,14 @@ def delete_order(order_id: int):
     try:
         order = session.query(Order).filter(Order.id == order_id).first()
         if order:
-            session.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+            order_items = session.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+            user_id = order.user_id
+            total_amount = order.total_amount
+            items = [{'product_id': item.product_id, 'quantity': item.quantity} for item in order_items]
             session.delete(order)
             session.commit()
 
-            delete_order_from_redis(order_id)
+            delete_order_from_redis(order_id, user_id, total_amount, items)
             return 1
         else:
             return 0
@@ -145,21 +257,113 @@ def delete_order(order_id: int):
         session.close()
 
 
-def add_order_to_redis(order_id, user_id, total_amount, items, payment_link=""):
-    """Insert order to Redis"""
+def to_cents(amount):
+    """Convert an amount to integer cents, so that sorted set scores stay exact"""
+    return int(round(float(amount) * 100))
+
+
+def encode_order(user_id, total_amount, items, payment_link="", is_paid=False):
+    """
+    Compact Redis hash of an order: amount in integer cents and items as "product_id:quantity" pairs.
+    Every value stays short, so Redis keeps the hash in its small (listpack) encoding.
+    """
+    return {
+        "user_id": user_id,
+        "total_cents": to_cents(total_amount),
+        "items": ",".join(f"{int(item['product_id'])}:{int(item['quantity'])}" for item in items),
+        "payment_link": payment_link,
+        "is_paid": int(bool(is_paid))
+    }
+
+
+def decode_order(raw_order):
+    """Public view of an order hash, whether it was written in the compact format or the former JSON/float one"""
+    order = dict(raw_order)
+    if 'total_cents' in order:
+        order['total_amount'] = str(int(order.pop('total_cents')) / 100)
+    items = order.get('items')
+    if items is not None and not items.startswith('['):
+        order['items'] = json.dumps(decode_items(items))
+    return order
+
+
+def decode_items(value):
+    """Items of an order hash, from either format"""
+    if not value:
+        return []
+    if value.startswith('['):
+        return json.loads(value)
+    items = []
+    for pair in value.split(','):
+        product_id, quantity = pair.split(':')
+        items.append({'product_id': int(product_id), 'quantity': int(quantity)})
+    return items
+
+
+def expire_order(pipeline, order_id, is_paid=False):
+    """Apply the retention policy to an order hash (MySQL serves it again once it has expired)"""
+    ttl = config.ORDER_REDIS_TTL_SECONDS
+    if is_paid and config.ORDER_REDIS_PAID_TTL_SECONDS > 0:
+        ttl = config.ORDER_REDIS_PAID_TTL_SECONDS
+    if ttl > 0:
+        pipeline.expire(f"order:{order_id}", ttl)
+
+
+def add_order_to_redis(order_id, user_id, total_amount, items, payment_link="", pipeline=None):
+    """
+    Insert order to Redis and update report aggregates in the same transaction.
+    If a pipeline is given, the commands are only queued on it and the caller executes it.
+    """
+    own_pipeline = pipeline is None
+    if own_pipeline:
+        pipeline = get_redis_conn().pipeline(transaction=True)
+    pipeline.hset(f"order:{order_id}", mapping=encode_order(user_id, total_amount, items, payment_link))
+    expire_order(pipeline, order_id)
+    pipeline.zincrby(HIGHEST_SPENDERS_KEY, to_cents(total_amount), user_id)
+    for product_id, quantity in _quantities_by_product(items).items():
+        pipeline.zincrby(BEST_SELLERS_KEY, quantity, product_id)
+    if own_pipeline:
+        pipeline.execute()
+
+
+def update_order_in_redis(order_id, payment_link, is_paid):
+    """Update the payment fields of an order hash in place, if it is in Redis, and apply the retention policy"""
     r = get_redis_conn()
-    r.hset(
-        f"order:{order_id}",
-        mapping={
-            "user_id": user_id,
-            "total_amount": float(total_amount),
-            "items": json.dumps(items),
-            "payment_link": payment_link
-        }
-    )
+    key = f"order:{order_id}"
+    if not r.exists(key):
+        # Absente (ou expirée) : le repli sur MySQL la relira à jour
+        return
+    pipeline = r.pipeline(transaction=True)
+    pipeline.hset(key, mapping={"payment_link": payment_link, "is_paid": int(bool(is_paid))})
+    expire_order(pipeline, order_id, is_paid)
+    pipeline.execute()
 
 
-def delete_order_from_redis(order_id):
-    """Delete order from Redis"""
+def delete_order_from_redis(order_id, user_id=None, total_amount=None, items=None):
+    """Delete order from Redis and update report aggregates in the same transaction"""
     r = get_redis_conn()
-    r.delete(f"order:{order_id}")
+    key = f"order:{order_id}"
+    if user_id is None or total_amount is None or items is None:
+        order = decode_order(r.hgetall(key))
+        user_id = order.get("user_id")
+        total_amount = order.get("total_amount")
+        items = decode_items(order.get("items"))
+
+    pipeline = r.pipeline(transaction=True)
+    pipeline.delete(key)
+    if user_id is not None and total_amount is not None:
+        pipeline.zincrby(HIGHEST_SPENDERS_KEY, -to_cents(total_amount), user_id)
+        pipeline.zremrangebyscore(HIGHEST_SPENDERS_KEY, "-inf", 0)
+    for product_id, quantity in _quantities_by_product(items).items():
+        pipeline.zincrby(BEST_SELLERS_KEY, -quantity, product_id)
+    pipeline.zremrangebyscore(BEST_SELLERS_KEY, "-inf", 0)
+    pipeline.execute()
+
+
+def _quantities_by_product(items):
+    """Sum item quantities per product (an order may list the same product twice)"""
+    quantities = {}
+    for item in items:
+        product_id = int(item['product_id'])
+        quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+    return quantities
@@ -6,6 +6,7 @@ Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 
 from orders.models.user import User
 from db import get_sqlalchemy_session
+from orders.queries.read_user import user_cache
 
 def add_user(name: str, email: str):
     """Insert user with items in MySQL"""
@@ -19,6 +20,7 @@ def add_user(name: str, email: str):
         session.add(new_user)
         session.flush() 
         session.commit()
+        user_cache.invalidate(new_user.id)
         return new_user.id
     except Exception as e:
         session.rollback()
@@ -34,6 +36,7 @@ def delete_user(user_id: int):
         if user:
             session.delete(user)
             session.commit()
+            user_cache.invalidate(user_id)
             return 1  
         else:
             return 0  
@@ -4,14 +4,17 @@ SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 import traceback
+import config
 from logger import Logger
 from flask import jsonify
-from db import get_redis_conn
-from orders.commands.write_order import add_order, delete_order, modify_order
-from orders.queries.read_order import get_order_by_id, get_best_selling_products, get_highest_spending_users
+from orders.commands.write_order import add_order, add_orders, delete_order, modify_order
+from orders.queries.read_order import get_order_by_id, get_orders_by_ids, get_best_selling_products, get_highest_spending_users
 
 logger = Logger.get_instance("order_controller")
 
+MAX_BATCH_IDS = 100
+MAX_REPORT_LIMIT = 100
+
 def create_order(request):
     """Create order, use WriteOrder model"""
     payload = request.get_json() or {}
@@ -24,6 +27,26 @@ def create_order(request):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
     
+def create_orders(request):
+    """Create many orders at once, use WriteOrder model. The response has one result per order."""
+    payload = request.get_json() or {}
+    orders = payload.get('orders')
+    if not isinstance(orders, list) or not orders:
+        return jsonify({'error': 'orders must be a non-empty list'}), 400
+    if len(orders) > config.ORDER_BATCH_MAX_SIZE:
+        return jsonify({'error': f'At most {config.ORDER_BATCH_MAX_SIZE} orders can be created at once'}), 400
+    try:
+        results = add_orders(orders)
+        created = sum(1 for result in results if 'order_id' in result)
+        return jsonify({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results
+        }), 201 if created else 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 def update_order(request):
     """Update order, use WriteOrder model"""
     payload = request.get_json() or {}
@@ -33,17 +56,11 @@ def update_order(request):
     logger.debug(f"Mettre à jour la commande {order_id}, status={is_paid}")
 
     try:
-        # update MySQL
+        # update MySQL (modify_order met aussi à jour les champs modifiés dans Redis)
         status = modify_order(order_id, payment_link=payment_link, is_paid=is_paid)
-        
-        # update Redis
-        r = get_redis_conn()
-        order = r.hgetall(f"order:{order_id}")
-        order['is_paid'] = str(is_paid)
-        r.hset(f"order:{order_id}", mapping=order)
 
         # response
-        logger.debug("Statut actuel", status)
+        logger.debug(f"Statut actuel : {status}")
         return jsonify({'updated': status}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -66,10 +83,31 @@ def get_order(order_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
+def get_orders(request):
+    """Get several orders (?ids=1,2,3), use ReadOrder model"""
+    try:
+        order_ids = [int(order_id) for order_id in request.args.get('ids', '').split(',') if order_id.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+    if not order_ids:
+        return jsonify({'error': 'ids is required'}), 400
+    if len(order_ids) > MAX_BATCH_IDS:
+        return jsonify({'error': f'At most {MAX_BATCH_IDS} ids can be requested at once'}), 400
+
+    try:
+        orders = get_orders_by_ids(order_ids)
+        order_ids = list(dict.fromkeys(order_ids))
+        return jsonify({
+            'orders': [{'order_id': order_id, **orders[order_id]} for order_id in order_ids if order_id in orders],
+            'missing': [order_id for order_id in order_ids if order_id not in orders]
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 def get_report_highest_spending_users():
     """Get orders report: highest spending users"""
     return get_highest_spending_users()
 
-def get_report_best_selling_products():
-    """Get orders report: best selling products"""
-    return get_best_selling_products()
\ No newline at end of file
+def get_report_best_selling_products(limit=10):
+    """Get orders report: best selling products (limit is clamped to 1..MAX_REPORT_LIMIT)"""
+    return get_best_selling_products(min(max(limit, 1), MAX_REPORT_LIMIT))
\ No newline at end of file
@@ -4,16 +4,15 @@ SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 from typing import Dict, Any
-import config
 from event_management.base_handler import EventHandler
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
 
 
 class OrderCancelledHandler(EventHandler):
     """Handles OrderCancelled events"""
     
     def __init__(self):
-        self.order_producer = OrderEventProducer()
         super().__init__()
     
     def get_event_type(self) -> str:
@@ -24,6 +23,6 @@ class OrderCancelledHandler(EventHandler):
         """Execute every time the event is published"""
         # La commande a été annullé, il n'y a donc rien d'autre à faire. Déclenchez l'événement SagaCompleted.
         event_data['event'] = "SagaCompleted"
-        OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+        OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
 
 
@@ -4,18 +4,21 @@ SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 from typing import Dict, Any
-import config
 from db import get_sqlalchemy_session
 from event_management.base_handler import EventHandler
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
 from stocks.commands.write_stock import check_out_items_from_stock
+from stocks.commands.stock_reservation import (
+    ALREADY_RELEASED, COMMITTED, MISSING, SHORT,
+    mark_reservation_committed, release_items_in_redis, reserve_items_in_redis, seed_stocks_in_redis
+)
 
 
 class OrderCreatedHandler(EventHandler):
     """Handles OrderCreated events"""
     
     def __init__(self):
-        self.order_producer = OrderEventProducer()
         super().__init__()
     
     def get_event_type(self) -> str:
@@ -23,33 +26,60 @@ class OrderCreatedHandler(EventHandler):
         return "OrderCreated"
     
     def handle(self, event_data: Dict[str, Any]) -> None:
-        """Execute every time the event is published"""
-        # TODO: Remplacez TOUTES les lignes de cette méthode par les lignes de la méthode _handle_implemented. Il suffit de copier-coller.
-        event_data['event'] = "StockDecreased"
-        self.logger.debug(f"payment_link={event_data['payment_link']}")
-        OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
-
-    def _handle_implemented(self, event_data: Dict[str, Any]) -> None:
         """
-        This method is here as a reference for the implementation of the method handle.
-        It will never be called if Sotre Manager is following normal operation.
-        Once you copy-paste the implementation, you can delete this method if you want.
+        Reserve the stock in Redis (one atomic Lua script), then decrement it in MySQL in one transaction.
+        The Redis reservation is released if MySQL fails. Emits StockDecreased or StockDecreaseFailed.
         """
-        order_event_producer = OrderEventProducer()
+        order_id = event_data['order_id']
         try:
-            # La création de la comande a réussi, alors déclenchez la mise à jour du stock.
-            session = get_sqlalchemy_session()
-            check_out_items_from_stock(session, event_data['order_items'])
-            session.commit()
-            # Si la mise à jour du stock a réussi, déclenchez StockDecreased.
-            event_data['event'] = "StockDecreased"
+            status, short_items = self._reserve_stock(event_data)
         except Exception as e:
-            session.rollback()
-            # Si la mise à jour du stock a échoué, déclenchez StockDecreaseFailed.
-            event_data['event'] = "StockDecreaseFailed"
-            event_data['error'] = str(e)
-        finally:
-            session.close()
-            order_event_producer.get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            # Sans Redis, la réservation ne peut pas être rendue une seule fois plus tard : on refuse la commande
+            self._send_failure(event_data, f"Stock reservation unavailable: {e}")
+            return
+
+        if status == ALREADY_RELEASED:
+            # OrderCreated relivré après la compensation : le stock de cette commande a déjà été rendu
+            self._send_failure(event_data, "The stock reserved for this order was already released")
+            return
+        if status == MISSING:
+            self._send_failure(event_data, f"Products not found in stock: {[item['product_id'] for item in short_items]}")
+            return
+        if status == SHORT:
+            self._send_failure(event_data, f"Insufficient stock for items: {short_items}")
+            return
+
+        if status != COMMITTED:
+            # RESERVED, ou PENDING si un essai précédent s'est arrêté avant la confirmation MySQL
+            session = get_sqlalchemy_session()
+            try:
+                check_out_items_from_stock(session, event_data['order_items'])
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                release_items_in_redis(order_id)
+                self._send_failure(event_data, str(e))
+                return
+            finally:
+                session.close()
+            mark_reservation_committed(order_id)
+
+        event_data['event'] = "StockDecreased"
+        self.logger.debug(f"payment_link={event_data['payment_link']}")
+        OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
 
+    def _reserve_stock(self, event_data: Dict[str, Any]):
+        """
+        Accept or reject the order with a single atomic Lua script in Redis, before touching MySQL.
+        Products missing from Redis (cold cache) are first loaded from MySQL, then the reservation is tried again.
+        """
+        status, short_items = reserve_items_in_redis(event_data['order_id'], event_data['order_items'])
+        if status == MISSING:
+            seed_stocks_in_redis([item['product_id'] for item in short_items if item['available'] is None])
+            status, short_items = reserve_items_in_redis(event_data['order_id'], event_data['order_items'])
+        return status, short_items
 
+    def _send_failure(self, event_data: Dict[str, Any], error: str) -> None:
+        event_data['event'] = "StockDecreaseFailed"
+        event_data['error'] = error
+        OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
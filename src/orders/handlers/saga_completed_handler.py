@@ -5,13 +5,11 @@ Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 from typing import Dict, Any
 from event_management.base_handler import EventHandler
-from orders.commands.order_event_producer import OrderEventProducer
 
 class SagaCompletedHandler(EventHandler):
     """Handles SagaCompleted events (either for successful or failed completion) """
     
     def __init__(self):
-        self.order_producer = OrderEventProducer()
         super().__init__()
     
     def get_event_type(self) -> str:
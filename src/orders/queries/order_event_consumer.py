@@ -4,103 +4,314 @@ SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
-import json
+import queue
 import threading
+import time
+import zlib
+from collections import deque
+import config
 from logger import Logger
-from typing import Optional
-from kafka import KafkaConsumer
+from typing import Dict, Iterable, List, Optional, Set
+from kafka import KafkaConsumer, ConsumerRebalanceListener
+from db import remove_scoped_session
+from event_management.codecs import decode_event
 from event_management.handler_registry import HandlerRegistry
+from event_management.offset_tracker import OffsetTracker
+from orders.commands.order_event_producer import OrderEventProducer
 from singleton import Singleton
 
 logger = Logger.get_instance("OrderConsumer")
 
 class OrderEventConsumer(metaclass=Singleton):
     """Main consumer class that receives processes Kafka events"""
-    
+
     def __init__(
         self,
         bootstrap_servers: str,
-        topic: str,
+        topics: List[str],
         group_id: str,
         registry: HandlerRegistry,
+        worker_count: int = config.KAFKA_CONSUMER_WORKERS,
+        queue_size: int = config.KAFKA_CONSUMER_QUEUE_SIZE,
     ):
         self.bootstrap_servers = bootstrap_servers
-        self.topic = topic
+        self.topics = topics
         self.group_id = group_id
         self.registry = registry
         self.auto_offset_reset = 'latest'
         self.consumer: Optional[KafkaConsumer] = None
         self.running = False
         self.consumer_thread: Optional[threading.Thread] = None
-    
+        self.worker_count = max(worker_count, 1)
+        self.queue_size = max(queue_size, 1)
+        self.worker_queues: List[queue.Queue] = []
+        self.worker_threads: List[threading.Thread] = []
+        # Événements qui n'ont pas pu entrer dans la file (pleine) de leur worker, dans l'ordre d'arrivée
+        self.backlogs: List[deque] = []
+        self.paused_partitions: Set = set()
+        self.offset_tracker = OffsetTracker()
+
     def start(self) -> None:
         """Start consuming messages from Kafka in a background thread so it does not prevent Flask from starting"""
         if self.running:
             return
-            
+
         self.running = True
+        self._start_workers()
         self.consumer_thread = threading.Thread(target=self._consume_messages)
-        self.consumer_thread.daemon = True 
+        self.consumer_thread.daemon = True
         self.consumer_thread.start()
-    
+
+    def _start_workers(self) -> None:
+        """Start the worker threads, each one with its own bounded queue"""
+        self.worker_queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.worker_count)]
+        self.backlogs = [deque() for _ in range(self.worker_count)]
+        self.worker_threads = []
+        for index, worker_queue in enumerate(self.worker_queues):
+            worker = threading.Thread(target=self._work, args=(worker_queue,), name=f"OrderConsumerWorker-{index}")
+            worker.daemon = True
+            worker.start()
+            self.worker_threads.append(worker)
+
     def _consume_messages(self) -> None:
-        """Continuously consume messages from Kafka"""
-        logger.debug(f"Démarrer un consommateur pour le topic : {self.topic}")
-        
+        """Continuously consume messages from Kafka and dispatch them to the workers"""
+        logger.debug(f"Démarrer un consommateur pour les topics : {self.topics}")
+
         self.consumer = KafkaConsumer(
-            self.topic,
             bootstrap_servers=self.bootstrap_servers,
             group_id=self.group_id,
             auto_offset_reset=self.auto_offset_reset,
-            value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-            enable_auto_commit=True,
+            enable_auto_commit=False,
             session_timeout_ms=30000,
             heartbeat_interval_ms=10000,
             max_poll_interval_ms=300000,
-            max_poll_records=10
+            max_poll_records=config.KAFKA_MAX_POLL_RECORDS
         )
-        
+        self.consumer.subscribe(self.topics, listener=_CommitOnRebalance(self))
+
         try:
             while self.running:
-                messages = self.consumer.poll(timeout_ms=1000)
-                
+                self._drain_backlogs()
+                self._resume_drained_partitions()
+                messages = self.consumer.poll(timeout_ms=config.KAFKA_POLL_TIMEOUT_MS)
+
                 for topic_partition, records in messages.items():
                     for message in records:
-                        self._process_message(message.value)
-                        
+                        self.offset_tracker.track(topic_partition, message.offset)
+                        try:
+                            event_data = decode_event(message.value, message.headers)
+                        except Exception as e:
+                            logger.error(f"Message illisible ignoré (offset {message.offset}) : {e}")
+                            self.offset_tracker.done(topic_partition, message.offset)
+                            continue
+                        self._dispatch(topic_partition, message.offset, event_data)
+
+                self._commit_async()
+
         except Exception as e:
             logger.error(f"Erreur : {e}", exc_info=True)
         finally:
             if self.consumer:
-                self.consumer.close()
+                self._stop_workers()
+                self._commit_sync()
+                self.consumer.close(autocommit=False)
                 logger.debug("Le consommateur a été arrêté !")
                 self.stop()
-    
+
+    def _commit_async(self) -> None:
+        """Commit, without blocking, the offsets of every message whose handler has finished"""
+        offsets = self.offset_tracker.committable()
+        if offsets and self._flush_emitted_events():
+            self.consumer.commit_async(offsets=offsets, callback=self._on_commit)
+
+    def _flush_emitted_events(self) -> bool:
+        """
+        Wait until the events emitted by the finished handlers have left the producer buffer:
+        an offset must never be committed before the events its handler emitted (at-least-once).
+        """
+        try:
+            OrderEventProducer().flush(timeout=config.KAFKA_PRODUCER_SEND_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.error(f"Événements émis non envoyés, commit des offsets reporté : {e}")
+            return False
+
+    def _on_commit(self, offsets, response) -> None:
+        if isinstance(response, Exception):
+            logger.warning(f"Échec du commit asynchrone des offsets : {response}")
+        else:
+            self.offset_tracker.mark_committed(offsets)
+
+    def _commit_sync(self, partitions=None) -> None:
+        """Commit synchronously (rebalance or shutdown)"""
+        offsets = self.offset_tracker.committable(partitions)
+        if not offsets or not self._flush_emitted_events():
+            return
+        try:
+            self.consumer.commit(offsets=offsets)
+            self.offset_tracker.mark_committed(offsets)
+        except Exception as e:
+            logger.error(f"Échec du commit des offsets : {e}")
+
+    def _dispatch(self, topic_partition, offset: int, event_data: dict) -> None:
+        """
+        Send the event to the worker that owns its order, so events of the same order stay in order.
+        The poll thread never blocks: if the worker queue is full, the event waits in a local backlog
+        and its partition is paused until the backlog is drained (polling, and thus group membership, continues).
+        """
+        index = self._get_worker_index(event_data)
+        item = (topic_partition, offset, event_data)
+        backlog = self.backlogs[index]
+        if not backlog:
+            try:
+                self.worker_queues[index].put_nowait(item)
+                return
+            except queue.Full:
+                pass
+        backlog.append(item)
+        if topic_partition not in self.paused_partitions:
+            self.consumer.pause(topic_partition)
+            self.paused_partitions.add(topic_partition)
+            logger.debug(f"Worker {index} en retard : partition {topic_partition} mise en pause")
+
+    def _get_worker_index(self, event_data: dict) -> int:
+        """Hash the order_id to pick a worker"""
+        order_id = event_data.get('order_id') if isinstance(event_data, dict) else None
+        if isinstance(order_id, int):
+            return order_id % self.worker_count
+        return zlib.crc32(str(order_id).encode('utf-8')) % self.worker_count
+
+    def _drain_backlogs(self) -> None:
+        """Move backlogged events to their worker queue, as far as there is room"""
+        for worker_queue, backlog in zip(self.worker_queues, self.backlogs):
+            while backlog:
+                try:
+                    worker_queue.put_nowait(backlog[0])
+                except queue.Full:
+                    break
+                backlog.popleft()
+
+    def _resume_drained_partitions(self) -> None:
+        """Resume the paused partitions that no longer have events in a backlog"""
+        if not self.paused_partitions:
+            return
+        backlogged = {item[0] for backlog in self.backlogs for item in backlog}
+        resumable = [tp for tp in self.paused_partitions if tp not in backlogged]
+        if resumable:
+            self.consumer.resume(*resumable)
+            self.paused_partitions.difference_update(resumable)
+            logger.debug(f"Reprise de la consommation : {resumable}")
+
+    def _drop_backlog(self, partitions: Iterable) -> Dict:
+        """Remove the backlogged events of revoked partitions (the next owner reads them again); returns their offsets"""
+        partitions = set(partitions)
+        dropped = {}
+        for index, backlog in enumerate(self.backlogs):
+            kept = deque()
+            for item in backlog:
+                if item[0] in partitions:
+                    dropped.setdefault(item[0], set()).add(item[1])
+                else:
+                    kept.append(item)
+            self.backlogs[index] = kept
+        self.paused_partitions.difference_update(partitions)
+        return dropped
+
+    def _work(self, worker_queue: queue.Queue) -> None:
+        """Process the events of one worker queue, one after another"""
+        while True:
+            item = worker_queue.get()
+            try:
+                if item is None:
+                    return
+                topic_partition, offset, event_data = item
+                # Un événement en échec n'est pas marqué terminé : son offset (et les suivants) ne sera pas commité
+                if self._process_with_retries(event_data):
+                    self.offset_tracker.done(topic_partition, offset)
+            finally:
+                worker_queue.task_done()
+
+    def _process_with_retries(self, event_data: dict) -> bool:
+        """
+        Run the handler, retrying with a backoff on failure. An event that still fails is sent to the dead-letter topic.
+        Returns True once the event is handled or dead-lettered, False if it could not even be dead-lettered.
+        """
+        for attempt in range(config.KAFKA_HANDLER_MAX_RETRIES + 1):
+            try:
+                self._process_message(event_data)
+                return True
+            except Exception as e:
+                error = e
+                logger.warning(f"Échec du traitement de {event_data.get('event')} (essai {attempt + 1}) : {e}")
+                if attempt < config.KAFKA_HANDLER_MAX_RETRIES:
+                    time.sleep(config.KAFKA_HANDLER_RETRY_BACKOFF * (2 ** attempt))
+        try:
+            OrderEventProducer().send(
+                config.KAFKA_DEAD_LETTER_TOPIC,
+                value={**event_data, 'error': str(error)},
+                durable=True
+            )
+            logger.error(f"Événement {event_data.get('event')} envoyé dans {config.KAFKA_DEAD_LETTER_TOPIC} : {error}")
+            return True
+        except Exception as e:
+            logger.error(f"Événement {event_data.get('event')} non traité ni mis de côté, il sera relu : {e}")
+            return False
+
     def _process_message(self, event_data: dict) -> None:
-        """Process a single message"""
+        """Process a single message (an exception raised by the handler is propagated)"""
         event_type = event_data.get('event')
-        
+
         if not event_type:
             logger.warning(f"Message missing 'event' field: {event_data}")
             return
-        
+
         handler = self.registry.get_handler(event_type)
-        
+
         if handler:
             try:
                 logger.debug(f"Evenement : {event_type}")
-                handler.handle(event_data)
-            except Exception as e:
-                logger.error(f"Error handling event {event_type}: {e}", exc_info=True)
+                # Le handler peut modifier l'événement : chaque essai repart d'une copie
+                handler.handle(dict(event_data))
+            finally:
+                remove_scoped_session()
         else:
             logger.debug(f"Aucun handler enregistré pour le type : {event_type}")
-    
+
+    def _stop_workers(self) -> None:
+        """Let the workers finish the events already dispatched, then stop them"""
+        for worker_queue in self.worker_queues:
+            worker_queue.put(None)
+        for worker in self.worker_threads:
+            worker.join(timeout=10)
+        self.worker_queues = []
+        self.worker_threads = []
+
     def stop(self) -> None:
         """Stop the consumer gracefully"""
         self.running = False
-        
-        if self.consumer_thread and self.consumer_thread.is_alive():
+
+        if self.consumer_thread and self.consumer_thread.is_alive() and threading.current_thread() is not self.consumer_thread:
             self.consumer_thread.join(timeout=10)
-            
+
         logger.debug("Arrêter le consommateur!")
-    
\ No newline at end of file
+
+
+class _CommitOnRebalance(ConsumerRebalanceListener):
+    """Commit the finished messages of the revoked partitions before another consumer takes them over"""
+
+    def __init__(self, event_consumer: OrderEventConsumer):
+        self.event_consumer = event_consumer
+
+    def on_partitions_revoked(self, revoked):
+        tracker = self.event_consumer.offset_tracker
+        # Les événements encore en backlog ne seront jamais traités ici : ils restent non commités
+        dropped = self.event_consumer._drop_backlog(revoked)
+        if not tracker.wait_until_done(revoked, timeout=10, excluding=dropped):
+            logger.warning("Des événements sont encore en traitement, ils seront relus par le prochain consommateur")
+        self.event_consumer._commit_sync(revoked)
+        tracker.forget(revoked)
+
+    def on_partitions_assigned(self, assigned):
+        # Les nouvelles partitions ne sont pas en pause
+        self.event_consumer.paused_partitions.difference_update(assigned)
+
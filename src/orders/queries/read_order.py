@@ -3,23 +3,79 @@ Orders (read-only model)
 SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
-import json
-from db import get_redis_conn, get_sqlalchemy_session
-from collections import defaultdict
+from db import get_redis_conn, get_scoped_session, get_sqlalchemy_session
+from orders.commands.write_order import HIGHEST_SPENDERS_KEY, BEST_SELLERS_KEY, decode_order, encode_order, expire_order
 from orders.models.order import Order
 from orders.models.order_item import OrderItem
 from sqlalchemy.sql import func
 
 def get_order_by_id(order_id):
-    """Get order by ID from Redis"""
+    """Get order by ID from Redis, or from MySQL (repopulating Redis) if the key is missing"""
+    return get_orders_by_ids([order_id]).get(int(order_id), {})
+
+def get_orders_by_ids(order_ids):
+    """
+    Get several orders: one Redis pipeline for all ids, then one MySQL query for the misses.
+    Returns a dict {order_id: order}, without the orders that exist nowhere.
+    """
+    order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
     r = get_redis_conn()
-    raw_order = r.hgetall(f"order:{order_id}")
-    order = {}
-    for key, value in raw_order.items():
-        found_key = key.decode('utf-8') if isinstance(key, bytes) else key
-        found_value = value.decode('utf-8') if isinstance(value, bytes) else value
-        order[found_key] = found_value
-    return order
+    pipeline = r.pipeline(transaction=False)
+    for order_id in order_ids:
+        pipeline.hgetall(f"order:{order_id}")
+
+    orders = {}
+    misses = []
+    for order_id, raw_order in zip(order_ids, pipeline.execute()):
+        # Un hash sans user_id est incomplet (expiré pendant une mise à jour) : on le relit depuis MySQL
+        if raw_order and 'user_id' in raw_order:
+            orders[order_id] = decode_order(raw_order)
+        else:
+            misses.append(order_id)
+
+    if misses:
+        orders.update(_get_orders_from_mysql(r, misses))
+    return orders
+
+def _get_orders_from_mysql(r, order_ids):
+    """Load orders and their items with one joined query, then write the order hashes back to Redis"""
+    session = get_scoped_session()
+    rows = session.query(
+        Order.id,
+        Order.user_id,
+        Order.total_amount,
+        Order.payment_link,
+        Order.is_paid,
+        OrderItem.product_id,
+        OrderItem.quantity
+    ).outerjoin(OrderItem, OrderItem.order_id == Order.id)\
+     .filter(Order.id.in_(order_ids))\
+     .order_by(Order.id, OrderItem.id)\
+     .all()
+
+    found = {}
+    for row in rows:
+        order = found.setdefault(row.id, {
+            'user_id': row.user_id,
+            'total_amount': row.total_amount,
+            'items': [],
+            'payment_link': row.payment_link,
+            'is_paid': bool(row.is_paid)
+        })
+        if row.product_id is not None:
+            order['items'].append({'product_id': row.product_id, 'quantity': row.quantity})
+
+    # Seul le hash de la commande est réécrit : les agrégats des rapports la comptent déjà
+    pipeline = r.pipeline(transaction=True)
+    orders = {}
+    for order_id, order in found.items():
+        mapping = encode_order(**order)
+        pipeline.delete(f"order:{order_id}")
+        pipeline.hset(f"order:{order_id}", mapping=mapping)
+        expire_order(pipeline, order_id, order['is_paid'])
+        orders[order_id] = decode_order({key: str(value) for key, value in mapping.items()})
+    pipeline.execute()
+    return orders
 
 def get_highest_spending_users_mysql():
     """Get report of highest spending users from MySQL"""
@@ -72,27 +128,17 @@ def get_best_selling_products_mysql():
         session.close()
 
 def get_highest_spending_users_redis():
-    """Get report of highest spending users from Redis"""
+    """Get report of highest spending users from the Redis sorted set aggregate"""
     result = []
     try: 
         r = get_redis_conn()
         limit = 10
-        order_keys = r.keys("order:*")
-        spending = defaultdict(float)
-        
-        for key in order_keys:
-            order_data = r.hgetall(key)
-            if "user_id" in order_data and "total_amount" in order_data:
-                user_id = int(order_data["user_id"])
-                total = float(order_data["total_amount"])
-                spending[user_id] += total
-
-        # Trier par total dépensé (décroissant), limite X
-        highest_spending_users = sorted(spending.items(), key=lambda x: x[1], reverse=True)[:limit]
-        for user in highest_spending_users:
+        # L'agrégat est déjà trié par Redis (scores en cents), une seule commande suffit
+        highest_spending_users = r.zrevrange(HIGHEST_SPENDERS_KEY, 0, limit - 1, withscores=True)
+        for user_id, total_cents in highest_spending_users:
             result.append({
-                "user_id": user[0],
-                "total_expense": round(user[1], 2)
+                "user_id": int(user_id),
+                "total_expense": round(total_cents / 100, 2)
             })
 
     except Exception as e:
@@ -100,35 +146,17 @@ def get_highest_spending_users_redis():
 
     return result
 
-def get_best_selling_products_redis():
-    """Get report of best selling products by quantity sold from Redis"""
+def get_best_selling_products_redis(limit=10):
+    """Get report of best selling products by quantity sold from the Redis sorted set index"""
     result = []
 
     try:
         r = get_redis_conn()
-        limit = 10
-        order_keys = r.keys("order:*")
-        product_sales = defaultdict(int)
-        
-        for order_key in order_keys:
-            order_data = r.hgetall(order_key)
-            if "items" in order_data:
-                try:
-                    products = json.loads(order_data["items"])
-                except Exception:
-                    continue
-
-                for item in products:
-                    product_id = int(item.get("product_id", 0))
-                    quantity = int(item.get("quantity", 0))
-                    product_sales[product_id] += quantity
-
-        # Trier par total vendu (décroissant), limite X
-        best_selling = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:limit]
-        for product in best_selling:
+        best_selling = r.zrevrange(BEST_SELLERS_KEY, 0, limit - 1, withscores=True)
+        for product_id, quantity_sold in best_selling:
             result.append({
-                "product_id": product[0],
-                "quantity_sold": product[1]
+                "product_id": int(product_id),
+                "quantity_sold": int(quantity_sold)
             })
 
     except Exception as e:
@@ -140,6 +168,6 @@ def get_highest_spending_users():
     """ Get highest spending users report """
     return get_highest_spending_users_redis()
 
-def get_best_selling_products():
+def get_best_selling_products(limit=10):
     """ Get best selling products report """
-    return get_best_selling_products_redis()
\ No newline at end of file
+    return get_best_selling_products_redis(limit)
\ No newline at end of file
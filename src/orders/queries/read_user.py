@@ -4,12 +4,18 @@ SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
-from db import get_sqlalchemy_session
+from cache import ReadThroughCache
+from db import get_scoped_session
 from orders.models.user import User
 
+user_cache = ReadThroughCache("user")
+
 def get_user_by_id(user_id):
-    """Get user by ID """
-    session = get_sqlalchemy_session()
+    """Get user by ID (read-through cache)"""
+    return user_cache.get(user_id, lambda: _get_user_from_mysql(user_id))
+
+def _get_user_from_mysql(user_id):
+    session = get_scoped_session()
     result = session.query(User).filter_by(id=user_id).all()
 
     if len(result):
@@ -19,4 +25,4 @@ def get_user_by_id(user_id):
             'email': result[0].email
         }
     else:
-        return {}
\ No newline at end of file
+        return {}
@@ -4,18 +4,19 @@ SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 from typing import Dict, Any
-import config
 from db import get_sqlalchemy_session
 from event_management.base_handler import EventHandler
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
 from orders.models.order import Order
+from orders.commands.write_order import update_order_in_redis
+from payments.payment_client import get_payment_client
 
 
 class PaymentCreatedHandler(EventHandler):
     """Handles PaymentCreated events"""
 
     def __init__(self):
-        self.order_producer = OrderEventProducer()
         super().__init__()
 
     def get_event_type(self) -> str:
@@ -35,7 +36,7 @@ class PaymentCreatedHandler(EventHandler):
             payment_id = event_data.get("payment_id", 1)
             payment_link = event_data.get(
                 "payment_link",
-                f"http://api-gateway:8080/payments-api/payments/process/{payment_id}"
+                get_payment_client().get_payment_link(payment_id)
             )
             event_data["payment_link"] = payment_link
 
@@ -45,19 +46,21 @@ class PaymentCreatedHandler(EventHandler):
                 order.is_paid = True
                 order.payment_link = payment_link
                 session.commit()
+                # La commande payée est réglée : elle prend la rétention courte dans Redis
+                update_order_in_redis(order_id, payment_link, True)
             else:
                 raise Exception(f"Commande {order_id} introuvable pour mise à jour.")
 
             # Saga terminée avec succès
             event_data["event"] = "SagaCompleted"
             self.logger.debug(f"payment_link={event_data['payment_link']}")
-            OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
 
         except Exception as e:
             session.rollback()
             # Si ça casse, on termine quand même la saga mais avec erreur
             event_data["event"] = "SagaCompleted"
             event_data["error"] = str(e)
-            OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
         finally:
             session.close()
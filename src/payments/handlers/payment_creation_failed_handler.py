@@ -4,16 +4,18 @@ SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 from typing import Dict, Any
-import config
 from event_management.base_handler import EventHandler
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
+from db import get_sqlalchemy_session
+from stocks.commands.write_stock import check_in_items_to_stock
+from stocks.commands.stock_reservation import COMMITTED, release_items_in_redis
 
 
 class PaymentCreationFailedHandler(EventHandler):
     """Handles PaymentCreationFailed events"""
     
     def __init__(self):
-        self.order_producer = OrderEventProducer()
         super().__init__()
     
     def get_event_type(self) -> str:
@@ -22,10 +24,22 @@ class PaymentCreationFailedHandler(EventHandler):
     
     def handle(self, event_data: Dict[str, Any]) -> None:
         """Execute every time the event is published"""
+        session = get_sqlalchemy_session()
         try:
+            # Rendre le stock réservé par OrderCreatedHandler (retrouvé par order_id : l'événement reconstruit
+            # par l'Outbox ne porte pas l'état de la réservation). Le marqueur Redis garantit qu'il n'est rendu
+            # qu'une fois : la remise en stock MySQL n'est commitée que si Redis vient de rendre une réservation confirmée.
+            check_in_items_to_stock(session, event_data['order_items'])
+            if release_items_in_redis(event_data['order_id']) == COMMITTED:
+                session.commit()
+            else:
+                session.rollback()
             event_data['event'] = "StockIncreased"
-            OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
         except Exception as e:
+            session.rollback()
             event_data['event'] = "OrderCreationFailed"
             event_data['error'] = str(e)
-            OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
+        finally:
+            session.close()
@@ -4,7 +4,8 @@ SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
-from sqlalchemy import Column, Integer, Float, JSON
+from sqlalchemy import Column, Integer, Float, JSON, DateTime
+from sqlalchemy.sql import func
 from orders.models.base import Base
 
 class Outbox(Base):
@@ -15,4 +16,7 @@ class Outbox(Base):
     order_id = Column(Integer, nullable=False)
     total_amount = Column(Float, nullable=False)
     order_items = Column(JSON, nullable=False)
-    payment_id = Column(Integer, nullable=True)
\ No newline at end of file
+    payment_id = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
@@ -3,51 +3,181 @@ Outbox processor
 SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
-from datetime import datetime
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading
+import time
 import config
 from db import get_sqlalchemy_session
 from logger import Logger
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
 from orders.commands.write_order import modify_order
 from payments.models.outbox import Outbox
+from payments.payment_client import get_payment_client
 from kafka.errors import NoBrokersAvailable
+from sqlalchemy import or_
+from singleton import Singleton
 
 
-class OutboxProcessor():
+class OutboxProcessor(metaclass=Singleton):
     """Process items in the outbox"""
 
     def __init__(self):
         """Constructor method"""
         self.logger = Logger.get_instance("OutboxProcessor")
+        self.executor = ThreadPoolExecutor(max_workers=config.OUTBOX_MAX_WORKERS, thread_name_prefix="OutboxPayment")
+        self.running = False
+        self.relay_thread = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'processed': 0,
+            'failed': 0,
+            'retried': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'last_batch_seconds': 0.0,
+            'last_batch_items_per_second': 0.0
+        }
+        self._backlog = None
+        self._backlog_refreshed_at = 0.0
 
     def run(self, outbox_item=None):
         """
         Run the processor. If you pass an item to it, the processor will process it right away.
-        Otherwise, it will try to fetch all pending items from the database and process them.
+        Otherwise, it will drain every pending item from the database, batch by batch.
         If processing is successful, the processor will update the payment_id in every item, effectively marking it as processed.
+        Rows are claimed in a short transaction (SELECT ... FOR UPDATE SKIP LOCKED, then claimed_at is set), so several
+        processors never handle the same item and no row stays locked during the calls to the Payments API.
         """
         self.logger.debug("Start run")
         if outbox_item:
             self.logger.debug("item informed")
-            event_data = self._get_event_data(outbox_item)
-            self._process_outbox_item(event_data, outbox_item)
+            self._process_next_batch(outbox_item_id=outbox_item.id)
         else:
             self.logger.debug("no item informed")
-            session = get_sqlalchemy_session()
-            outbox_items = session.query(Outbox).filter(Outbox.payment_id.is_(None)).all()
-            for item in outbox_items:
-                event_data = self._get_event_data(item)
-                self._process_outbox_item(event_data, item)
-            if not outbox_items:
+            total = 0
+            while True:
+                processed = self._process_next_batch()
+                total += processed
+                if processed < config.OUTBOX_BATCH_SIZE:
+                    break
+            if not total:
                 self.logger.info("No outbox items to process.")
             else:
-                self.logger.info(f"{len(outbox_items)} outbox items processed.")
+                self.logger.info(f"{total} outbox items processed.")
+
+    def start(self):
+        """Start the relay: a background thread that keeps draining the outbox"""
+        if self.running:
+            return
+        self.running = True
+        self.relay_thread = threading.Thread(target=self._relay, name="OutboxRelay")
+        self.relay_thread.daemon = True
+        self.relay_thread.start()
+
+    def stop(self):
+        """Stop the relay gracefully"""
+        self.running = False
+        if self.relay_thread and self.relay_thread.is_alive():
+            self.relay_thread.join(timeout=10)
+
+    def _relay(self):
+        """Claim and process batches; wait between polls only when the outbox is empty"""
+        while self.running:
+            try:
+                processed = self._process_next_batch()
+            except Exception as e:
+                self.logger.error(f"Erreur du relais Outbox : {e}", exc_info=True)
+                processed = 0
+            if processed < config.OUTBOX_BATCH_SIZE:
+                time.sleep(config.OUTBOX_POLL_INTERVAL)
+
+    def _process_next_batch(self, outbox_item_id=None):
+        """Claim a batch of pending items, request their payments concurrently, then change the saga state of each one"""
+        started_at = time.perf_counter()
+        claimed_at, outbox_items = self._claim_batch(outbox_item_id)
+        if not outbox_items:
+            return 0
+
+        # Les appels à l'API Payments partent en parallèle, hors transaction : les lignes sont réservées par claimed_at
+        payment_results = list(self.executor.map(self._request_payment, outbox_items))
+        results = self._record_payments(outbox_items, payment_results, claimed_at)
+
+        for event_data, attempts, payment_id, error in results:
+            self._complete_outbox_item(event_data, attempts, payment_id, error)
+        self._record_batch(len(results), time.perf_counter() - started_at)
+        return len(results)
+
+    def _claim_batch(self, outbox_item_id=None):
+        """
+        Mark a batch of pending items as in flight and commit at once. An item whose claim is older than
+        OUTBOX_CLAIM_TIMEOUT (its processor stopped during the call) can be claimed again.
+        Returns the claim time (used as a token) and the claimed items, detached from the session.
+        """
+        # TIMESTAMP MySQL : à la seconde près, pour pouvoir comparer le jeton relu
+        claimed_at = datetime.now().replace(microsecond=0)
+        session = get_sqlalchemy_session()
+        try:
+            query = session.query(Outbox).filter(
+                Outbox.payment_id.is_(None),
+                Outbox.attempts < config.OUTBOX_MAX_ATTEMPTS,
+                or_(
+                    Outbox.claimed_at.is_(None),
+                    Outbox.claimed_at < claimed_at - timedelta(seconds=config.OUTBOX_CLAIM_TIMEOUT)
+                )
+            )
+            if outbox_item_id is not None:
+                query = query.filter(Outbox.id == outbox_item_id)
+            outbox_items = query.order_by(Outbox.id)\
+                .limit(config.OUTBOX_BATCH_SIZE)\
+                .with_for_update(skip_locked=True)\
+                .all()
+            if not outbox_items:
+                session.rollback()
+                return claimed_at, []
+            for outbox_item in outbox_items:
+                outbox_item.claimed_at = claimed_at
+            session.flush()
+            session.expunge_all()
+            session.commit()
+            return claimed_at, outbox_items
+        except Exception:
+            session.rollback()
+            raise
+        finally:
             session.close()
 
-    def _process_outbox_item(self, event_data, outbox_item):
-        """Processes a single outbox item and changes the saga state based on result"""
+    def _record_payments(self, outbox_items, payment_results, claimed_at):
+        """Store the payment results and release the claims, in one short transaction"""
+        results = []
         session = get_sqlalchemy_session()
+        try:
+            for outbox_item, (payment_id, error) in zip(outbox_items, payment_results):
+                if error is None:
+                    values = {Outbox.payment_id: payment_id, Outbox.claimed_at: None}
+                    attempts = outbox_item.attempts
+                else:
+                    values = {Outbox.attempts: Outbox.attempts + 1, Outbox.claimed_at: None}
+                    attempts = outbox_item.attempts + 1
+                updated = session.query(Outbox)\
+                    .filter(Outbox.id == outbox_item.id, Outbox.claimed_at == claimed_at)\
+                    .update(values, synchronize_session=False)
+                if not updated:
+                    # La réservation a expiré et un autre relais a repris l'élément : c'est lui qui le termine
+                    self.logger.warning(f"Élément {outbox_item.id} de l'Outbox repris par un autre relais")
+                    continue
+                results.append((self._get_event_data(outbox_item), attempts, payment_id, error))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        return results
+
+    def _request_payment(self, outbox_item):
+        """Request a payment and return (payment_id, error)"""
         payment_id = 1  # valeur par défaut pour le labo
         try:
             payment_response = self._request_payment_transaction(outbox_item)
@@ -65,18 +195,24 @@ class OutboxProcessor():
                     f"Payment API responded with {payment_response.status_code}, "
                     "on continue quand même pour le labo."
                 )
+            return payment_id, None
+        except Exception as e:
+            return None, e
 
-            # Mise à jour de la table Outbox
-            order_outbox = session.query(Outbox).filter(
-                Outbox.order_id == outbox_item.order_id
-            ).first()
-            if order_outbox:
-                order_outbox.payment_id = payment_id
-            session.commit()
+    def _complete_outbox_item(self, event_data, attempts, payment_id, error):
+        """Changes the saga state of a single outbox item based on the payment result"""
+        try:
+            if error is not None:
+                if attempts < config.OUTBOX_MAX_ATTEMPTS:
+                    # L'élément reste dans l'Outbox, le relais réessaiera plus tard
+                    self.logger.debug(f"Paiement de la commande {event_data['order_id']} à réessayer ({attempts}) : {error}")
+                    self._increment('retried')
+                    return
+                raise error
 
             # Mise à jour de la commande (is_paid + payment_link)
-            payment_link = f"http://api-gateway:8080/payments-api/payments/process/{payment_id}"
-            update_succeeded = modify_order(outbox_item.order_id, True, payment_link)
+            payment_link = get_payment_client().get_payment_link(payment_id)
+            update_succeeded = modify_order(event_data['order_id'], True, payment_link)
 
             if not update_succeeded:
                 raise Exception(
@@ -85,21 +221,21 @@ class OutboxProcessor():
 
             event_data['event'] = "PaymentCreated"
             event_data['payment_link'] = payment_link
+            self._increment('processed')
 
         except Exception as e:
-            session.rollback()
             self.logger.debug("La création d'une transaction de paiement a échoué (2) : " + str(e))
             event_data['event'] = "PaymentCreationFailed"
             event_data['error'] = str(e)
-        finally:
-            session.close()
-            # On essaie d'envoyer l'événement sur Kafka, mais on ne fait pas planter le service si Kafka est down
-            try:
-                OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
-            except NoBrokersAvailable as e:
-                self.logger.error(f"Kafka indisponible, événement non envoyé : {e}")
-            except Exception as e:
-                self.logger.error(f"Erreur lors de l'envoi vers Kafka : {e}")
+            self._increment('failed')
+
+        # On essaie d'envoyer l'événement sur Kafka, mais on ne fait pas planter le service si Kafka est down
+        try:
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
+        except NoBrokersAvailable as e:
+            self.logger.error(f"Kafka indisponible, événement non envoyé : {e}")
+        except Exception as e:
+            self.logger.error(f"Erreur lors de l'envoi vers Kafka : {e}")
 
     def _request_payment_transaction(self, outbox_item):
         """Request payment transaction to Payments API"""
@@ -108,12 +244,7 @@ class OutboxProcessor():
             "order_id": outbox_item.order_id,
             "total_amount": outbox_item.total_amount
         }
-        payment_response = requests.post(
-            'http://api-gateway:8080/payments-api/payments',
-            json=order_data,
-            headers={'Content-Type': 'application/json'}
-        )
-        return payment_response
+        return get_payment_client().create_payment(order_data)
 
     def _get_event_data(self, outbox_item):
         return {
@@ -125,3 +256,38 @@ class OutboxProcessor():
             'payment_link': 'no-link',
             'datetime': str(datetime.now())
         }
+
+    def _increment(self, counter):
+        with self._metrics_lock:
+            self._metrics[counter] += 1
+
+    def _record_batch(self, size, seconds):
+        with self._metrics_lock:
+            self._metrics['batches'] += 1
+            self._metrics['last_batch_size'] = size
+            self._metrics['last_batch_seconds'] = round(seconds, 3)
+            self._metrics['last_batch_items_per_second'] = round(size / seconds, 2) if seconds > 0 else 0.0
+
+    def get_metrics(self):
+        """Throughput counters and backlog (pending items) of the outbox"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['running'] = self.running
+        metrics['backlog'] = self._get_backlog()
+        return metrics
+
+    def _get_backlog(self):
+        """Count the pending items, at most once every OUTBOX_BACKLOG_REFRESH_INTERVAL seconds (not on every scrape)"""
+        now = time.monotonic()
+        if self._backlog is not None and now - self._backlog_refreshed_at < config.OUTBOX_BACKLOG_REFRESH_INTERVAL:
+            return self._backlog
+        session = get_sqlalchemy_session()
+        try:
+            self._backlog = session.query(Outbox).filter(
+                Outbox.payment_id.is_(None),
+                Outbox.attempts < config.OUTBOX_MAX_ATTEMPTS
+            ).count()
+            self._backlog_refreshed_at = now
+        finally:
+            session.close()
+        return self._backlog
@@ -0,0 +1,109 @@
+"""
+Outbox retention
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+import threading
+import time
+from sqlalchemy import text
+import config
+from db import get_sqlalchemy_session
+from logger import Logger
+from singleton import Singleton
+
+
+class OutboxRetention(metaclass=Singleton):
+    """
+    Move settled outbox items (paid, or out of attempts) to outbox_archive in small batches,
+    so the outbox table only holds recent rows and pending lookups stay fast.
+    """
+
+    def __init__(self):
+        """Constructor method"""
+        self.logger = Logger.get_instance("OutboxRetention")
+        self.running = False
+        self.retention_thread = None
+        self.archived = 0
+
+    def start(self):
+        """Start the retention job in a background thread"""
+        if self.running:
+            return
+        self.running = True
+        self.retention_thread = threading.Thread(target=self._loop, name="OutboxRetention")
+        self.retention_thread.daemon = True
+        self.retention_thread.start()
+
+    def stop(self):
+        """Stop the retention job gracefully"""
+        self.running = False
+        if self.retention_thread and self.retention_thread.is_alive():
+            self.retention_thread.join(timeout=10)
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.run()
+            except Exception as e:
+                self.logger.error(f"Erreur de la rétention Outbox : {e}", exc_info=True)
+            time.sleep(config.OUTBOX_RETENTION_INTERVAL)
+
+    def run(self):
+        """Archive every settled item older than the retention period, one short transaction per batch"""
+        total = 0
+        while True:
+            archived = self._archive_batch()
+            total += archived
+            if archived < config.OUTBOX_RETENTION_BATCH_SIZE:
+                break
+        if total:
+            self.logger.info(f"{total} éléments de l'Outbox ont été archivés")
+        return total
+
+    def _archive_batch(self):
+        session = get_sqlalchemy_session()
+        try:
+            rows = session.execute(
+                text("""
+                    SELECT id
+                    FROM outbox
+                    WHERE created_at < NOW() - INTERVAL :hours HOUR
+                      AND (payment_id IS NOT NULL OR attempts >= :max_attempts)
+                    ORDER BY id
+                    LIMIT :batch_size
+                    FOR UPDATE SKIP LOCKED
+                """),
+                {
+                    "hours": config.OUTBOX_RETENTION_HOURS,
+                    "max_attempts": config.OUTBOX_MAX_ATTEMPTS,
+                    "batch_size": config.OUTBOX_RETENTION_BATCH_SIZE
+                }
+            ).fetchall()
+            if not rows:
+                session.rollback()
+                return 0
+
+            id_params = {f"id{i}": row.id for i, row in enumerate(rows)}
+            id_list = ", ".join(f":id{i}" for i in range(len(rows)))
+            session.execute(
+                text(f"""
+                    INSERT INTO outbox_archive (id, user_id, order_id, total_amount, payment_id, order_items, attempts, created_at)
+                    SELECT id, user_id, order_id, total_amount, payment_id, order_items, attempts, created_at
+                    FROM outbox
+                    WHERE id IN ({id_list})
+                """),
+                id_params
+            )
+            session.execute(text(f"DELETE FROM outbox WHERE id IN ({id_list})"), id_params)
+            session.commit()
+            self.archived += len(rows)
+            return len(rows)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def get_metrics(self):
+        """Number of items archived since startup"""
+        return {'running': self.running, 'archived': self.archived}
@@ -0,0 +1,144 @@
+"""
+Payments API client
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError, ProtocolError
+import config
+from logger import Logger
+
+# Statuts renvoyés par la gateway quand l'API Payments n'a pas reçu la requête : on peut réessayer sans risque
+RETRY_STATUSES = (502, 503)
+
+
+class PaymentClient():
+    """
+    Pooled HTTP client for the Payments API.
+    Connections are kept alive and shared by every thread. Failures where the request never reached
+    the Payments API (connection refused or timed out while connecting, 502/503 from the gateway) are retried,
+    with a jittered exponential backoff. A connection reset or closed by the server (typically a pooled keep-alive
+    connection the server had already closed) is retried only for idempotent calls, i.e. sent with an Idempotency-Key
+    header: the Payments API then returns the payment already created instead of creating a second one.
+    """
+
+    def __init__(
+        self,
+        base_url: str = config.PAYMENTS_API_URL,
+        connect_timeout: float = config.PAYMENTS_API_CONNECT_TIMEOUT,
+        read_timeout: float = config.PAYMENTS_API_READ_TIMEOUT,
+        max_retries: int = config.PAYMENTS_API_MAX_RETRIES,
+        backoff: float = config.PAYMENTS_API_BACKOFF,
+        pool_size: int = config.PAYMENTS_API_POOL_SIZE,
+    ):
+        self.logger = Logger.get_instance("PaymentClient")
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'requests': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0}
+
+    def create_payment(self, order_data: dict) -> requests.Response:
+        """Request a payment transaction for an order (one payment per order, so the order id is the idempotency key)"""
+        order_id = order_data.get('order_id')
+        idempotency_key = f"order-{order_id}" if order_id is not None else None
+        return self._post(f"{self.base_url}/payments", order_data, idempotency_key)
+
+    def get_payment_link(self, payment_id) -> str:
+        """Get the link the user follows to pay"""
+        return f"{self.base_url}/payments/process/{payment_id}"
+
+    def _post(self, url: str, payload: dict, idempotency_key: str = None) -> requests.Response:
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        attempt = 0
+        while True:
+            started_at = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+            except requests.exceptions.ConnectionError as e:
+                self._record(started_at, error=True)
+                retryable = self._was_not_sent(e) or (idempotency_key is not None and self._was_disconnected(e))
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                self.logger.debug(f"Connexion à l'API Payments impossible, nouvel essai : {e}")
+            except requests.exceptions.RequestException:
+                self._record(started_at, error=True)
+                raise
+            else:
+                self._record(started_at, error=response.status_code >= 500)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                self.logger.debug(f"L'API Payments a répondu {response.status_code}, nouvel essai")
+            attempt += 1
+            self._increment_retries()
+            # Full jitter : attente aléatoire entre 0 et backoff * 2^tentative
+            time.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+
+    @staticmethod
+    def _was_not_sent(error: requests.exceptions.ConnectionError) -> bool:
+        """True if the connection could not be opened, so the request was never sent"""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        # requests enveloppe l'erreur de urllib3 : MaxRetryError(reason=NewConnectionError)
+        cause = error.args[0] if error.args else None
+        return isinstance(getattr(cause, 'reason', cause), NewConnectionError)
+
+    @staticmethod
+    def _was_disconnected(error: requests.exceptions.ConnectionError) -> bool:
+        """True if the server closed or reset the connection (RemoteDisconnected, ConnectionResetError...)"""
+        cause = error.args[0] if error.args else None
+        return isinstance(getattr(cause, 'reason', cause), ProtocolError)
+
+    def _record(self, started_at: float, error: bool) -> None:
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        with self._metrics_lock:
+            self._metrics['requests'] += 1
+            self._metrics['errors'] += int(error)
+            self._metrics['total_ms'] += elapsed_ms
+            self._metrics['max_ms'] = max(self._metrics['max_ms'], elapsed_ms)
+            self._metrics['last_ms'] = elapsed_ms
+
+    def _increment_retries(self) -> None:
+        with self._metrics_lock:
+            self._metrics['retries'] += 1
+
+    def get_metrics(self) -> dict:
+        """Latency (ms) and error counters of the calls to the Payments API"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['avg_ms'] = round(metrics['total_ms'] / metrics['requests'], 2) if metrics['requests'] else 0.0
+        for key in ('total_ms', 'max_ms', 'last_ms'):
+            metrics[key] = round(metrics[key], 2)
+        return metrics
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_payment_client() -> PaymentClient:
+    """Get the client shared by the whole process"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PaymentClient()
+    return _client
+
+
+def reset_payment_client() -> None:
+    """Forget the client inherited from the parent process (its keep-alive sockets must not be shared after fork)"""
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
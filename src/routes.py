@@ -0,0 +1,135 @@
+"""
+Store manager HTTP routes
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+from flask import Blueprint, current_app, request, jsonify
+from orders.controllers.order_controller import create_order, create_orders, remove_order, get_order, get_orders, get_report_highest_spending_users, get_report_best_selling_products, update_order
+from orders.controllers.user_controller import create_user, remove_user, get_user
+from stocks.controllers.product_controller import create_product, import_products_from_request, remove_product, get_product
+from stocks.controllers.stock_controller import get_stock, import_stock, set_stock, get_stock_overview
+from stocks.schemas.product_loader import ProductLoader
+from payments.outbox_processor import OutboxProcessor
+from payments.outbox_retention import OutboxRetention
+from payments.payment_client import get_payment_client
+from stocks.cache_warmup import CacheWarmup
+from db import get_pool_stats
+from orders.commands.order_event_producer import OrderEventProducer
+from orders.queries.read_user import user_cache
+from stocks.queries.read_product import product_cache
+
+bp = Blueprint('store_manager', __name__)
+
+@bp.get('/health-check')
+def health():
+    # Pas prête tant que le cache n'est pas préchargé : le load balancer n'envoie pas de trafic à une instance froide
+    if 'warmup' in current_app.extensions.get('background_services', ()) and not CacheWarmup().is_ready():
+        return jsonify({'status': 'warming', 'warmup': CacheWarmup().get_status()}), 503
+    return jsonify({'status': 'ok'})
+
+@bp.get('/metrics')
+def metrics():
+    return jsonify({
+        'db_pool': get_pool_stats(),
+        'cache_warmup': CacheWarmup().get_status(),
+        'kafka_producer': OrderEventProducer().get_metrics(),
+        'outbox': OutboxProcessor().get_metrics(),
+        'outbox_retention': OutboxRetention().get_metrics(),
+        'payments_api': get_payment_client().get_metrics(),
+        'graphql_cache': current_app.extensions['graphql_executor'].get_metrics(),
+        'startup': current_app.extensions.get('startup_times', {}),
+        'product_cache': product_cache.get_metrics(),
+        'user_cache': user_cache.get_metrics()
+    })
+
+@bp.post('/orders')
+def post_orders():
+    return create_order(request)
+
+@bp.post('/orders/batch')
+def post_orders_batch():
+    return create_orders(request)
+
+@bp.delete('/orders/<int:order_id>')
+def delete_orders_id(order_id):
+    return remove_order(order_id)
+
+@bp.post('/products')
+def post_products():
+    return create_product(request)
+
+@bp.post('/products/import')
+def post_products_import():
+    return import_products_from_request(request)
+
+@bp.delete('/products/<int:product_id>')
+def delete_products_id(product_id):
+    return remove_product(product_id)
+
+@bp.post('/users')
+def post_users():
+    return create_user(request)
+
+@bp.delete('/users/<int:user_id>')
+def delete_users_id(user_id):
+    return remove_user(user_id)
+
+@bp.post('/stocks')
+def post_stocks():
+    return set_stock(request)
+
+@bp.get('/orders')
+def get_orders_ids():
+    return get_orders(request)
+
+@bp.post('/stocks/import')
+def post_stocks_import():
+    return import_stock(request)
+
+@bp.get('/orders/<int:order_id>')
+def get_order_id(order_id):
+    return get_order(order_id)
+
+@bp.get('/products/<int:product_id>')
+def get_product_id(product_id):
+    return get_product(product_id)
+
+@bp.get('/users/<int:user_id>')
+def get_user_id(user_id):
+    return get_user(user_id)
+
+@bp.get('/stocks/<int:product_id>')
+def get_stocks(product_id):
+    return get_stock(product_id)
+
+@bp.get('/orders/reports/highest-spenders')
+def get_orders_highest_spending_users():
+    rows = get_report_highest_spending_users()
+    return jsonify(rows)
+
+@bp.get('/orders/reports/best-sellers')
+def get_orders_report_best_selling_products():
+    limit = request.args.get('limit', default=10, type=int)
+    rows = get_report_best_selling_products(limit)
+    return jsonify(rows)
+
+@bp.get('/stocks/reports/overview-stocks')
+def get_stocks_overview():
+    return get_stock_overview(request)
+
+@bp.post('/stocks/graphql-query')
+def graphql_supplier():
+    data = request.get_json()
+    result = current_app.extensions['graphql_executor'].execute(
+        data['query'],
+        variables=data.get('variables'),
+        context={'product_loader': ProductLoader()}
+    )
+    return jsonify({
+        'data': result.data,
+        'errors': [str(e) for e in result.errors] if result.errors else None
+    })
+
+@bp.put('/orders')
+def put_orders():
+    return update_order(request)
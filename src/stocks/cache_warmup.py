@@ -0,0 +1,137 @@
+"""
+Stock cache warm-up
+SPDX-License-Identifier: LGPL-3.0-or-later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+import threading
+import time
+from sqlalchemy import text
+import config
+from db import get_redis_conn, get_sqlalchemy_session
+from logger import Logger
+from singleton import Singleton
+from stocks.commands.write_stock import populate_redis_from_mysql
+
+
+class WarmupStopped(Exception):
+    """Raised between two chunks when the warm-up is stopped"""
+
+
+class CacheWarmup(metaclass=Singleton):
+    """
+    Fill the stock:* hashes from MySQL at startup, as soon as MySQL and Redis answer.
+    The instance is not ready (/health-check returns 503) until the warm-up has finished,
+    so the load balancer never sends traffic to a cold instance.
+    """
+
+    def __init__(self):
+        """Constructor method"""
+        self.logger = Logger.get_instance("CacheWarmup")
+        self.state = "pending"
+        self.total = None
+        self.warmed = 0
+        self.attempts = 0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.warmup_thread = None
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the warm-up in a background thread"""
+        if self.warmup_thread is not None:
+            return
+        self.warmup_thread = threading.Thread(target=self._loop, name="CacheWarmup")
+        self.warmup_thread.daemon = True
+        self.warmup_thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the warm-up after the current chunk and wait for its thread; returns False if it is still running"""
+        self._stopped.set()
+        if self.warmup_thread is not None:
+            self.warmup_thread.join(timeout)
+            return not self.warmup_thread.is_alive()
+        return True
+
+    def reset_after_fork(self):
+        """
+        Forget an unfinished warm-up inherited from the parent process (its thread does not survive fork),
+        so that the worker can start its own. A finished warm-up is kept.
+        """
+        if self.is_ready():
+            return
+        self.state = "pending"
+        self.warmed = 0
+        self.attempts = 0
+        self.started_at = None
+        self.warmup_thread = None
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+
+    def is_ready(self):
+        """True once every stock has been written to Redis"""
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until the warm-up has finished (or the timeout expires)"""
+        return self._ready.wait(timeout)
+
+    def _loop(self):
+        self.started_at = time.monotonic()
+        while not self.is_ready() and not self._stopped.is_set():
+            self.attempts += 1
+            try:
+                self.state = "waiting"
+                self._check_dependencies()
+                self.state = "warming"
+                self.run()
+            except WarmupStopped:
+                self.state = "stopped"
+            except Exception as e:
+                # MySQL ou Redis pas encore disponible (ou coupure pendant le préchargement) : on recommence
+                self.error = str(e)
+                self.logger.warning(f"Préchargement du cache impossible pour l'instant : {e}")
+                self._stopped.wait(config.CACHE_WARMUP_RETRY_INTERVAL)
+
+    def _check_dependencies(self):
+        """Raise if MySQL or Redis does not answer"""
+        get_redis_conn().ping()
+        session = get_sqlalchemy_session()
+        try:
+            self.total = session.execute(text("SELECT COUNT(*) FROM stocks")).scalar()
+        finally:
+            session.close()
+
+    def run(self):
+        """Write every stock to Redis, one chunk at a time, then mark the instance as ready"""
+        self.warmed = 0
+        self.warmed = populate_redis_from_mysql(
+            get_redis_conn(),
+            chunk_size=config.CACHE_WARMUP_CHUNK_SIZE,
+            on_progress=self._on_progress
+        )
+        self.finished_at = time.monotonic()
+        self.state = "ready"
+        self.error = None
+        self._ready.set()
+        self.logger.info(f"Cache préchargé : {self.warmed} produits en {self.finished_at - self.started_at:.1f} s")
+
+    def _on_progress(self, warmed):
+        if self._stopped.is_set():
+            raise WarmupStopped()
+        self.warmed = warmed
+        self.logger.debug(f"Préchargement du cache : {warmed}/{self.total} produits")
+
+    def get_status(self):
+        """Progress of the warm-up"""
+        end = self.finished_at or time.monotonic()
+        return {
+            'state': self.state,
+            'warmed': self.warmed,
+            'total': self.total,
+            'progress': round(self.warmed / self.total, 4) if self.total else (1.0 if self.is_ready() else 0.0),
+            'attempts': self.attempts,
+            'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else 0.0,
+            'error': self.error
+        }
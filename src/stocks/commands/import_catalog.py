@@ -0,0 +1,250 @@
+"""
+Catalog bulk import (products and stock levels, NDJSON or CSV)
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+
+Usage (depuis le répertoire src) :
+    python -m stocks.commands.import_catalog products catalogue.ndjson
+    python -m stocks.commands.import_catalog stocks stocks.csv --chunk-size 5000
+"""
+import argparse
+import csv
+import json
+from itertools import islice
+from sqlalchemy.dialects.mysql import insert
+import config
+from logger import Logger
+from db import get_redis_conn, get_sqlalchemy_session
+from stocks.models.product import Product
+from stocks.models.stock import Stock
+from stocks.queries.read_product import product_cache
+
+logger = Logger.get_instance("import_catalog")
+
+FORMATS = ('ndjson', 'csv')
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_records(text_stream, fmt):
+    """Read records one at a time from a text stream, yielding (line_number, record)"""
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(text_stream, 1):
+            if line.strip():
+                yield line_number, line
+    elif fmt == 'csv':
+        # La ligne 1 est l'en-tête
+        for line_number, record in enumerate(csv.DictReader(text_stream), 2):
+            yield line_number, record
+    else:
+        raise ValueError(f"Unknown import format: {fmt}. Expected one of {', '.join(FORMATS)}.")
+
+
+def import_products(records, chunk_size=config.IMPORT_CHUNK_SIZE):
+    """
+    Upsert products by SKU (name and price are updated if the SKU exists).
+    Records may also carry a quantity, in which case the stock level is upserted as well.
+    """
+    return _import(records, _parse_product, _write_products, chunk_size)
+
+
+def import_stocks(records, chunk_size=config.IMPORT_CHUNK_SIZE):
+    """Upsert stock levels by product_id (the quantity is replaced, like POST /stocks)"""
+    return _import(records, _parse_stock, _write_stocks, chunk_size)
+
+
+def _import(records, parse, write, chunk_size):
+    """Parse and write records chunk by chunk: each chunk is one transaction and one Redis pipeline"""
+    report = {'imported': 0, 'rejected': 0, 'errors': [], 'cache_errors': []}
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        rows = []
+        for line_number, record in chunk:
+            try:
+                rows.append((line_number, parse(record)))
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                _reject(report, line_number, e)
+        if rows:
+            write(rows, report)
+        logger.debug(f"Import : {report['imported']} lignes importées, {report['rejected']} rejetées")
+    logger.info(f"Import terminé : {report['imported']} lignes importées, {report['rejected']} rejetées")
+    return report
+
+
+def _reject(report, line_number, error):
+    report['rejected'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line_number, 'error': str(error)})
+
+
+def _refresh_cache(report, rows, refresh):
+    """
+    Run a cache update once a chunk is committed. The rows are imported either way,
+    so a Redis error is only reported (the next warm-up or cache miss repairs the cache).
+    """
+    try:
+        refresh()
+    except Exception as e:
+        logger.error(f"Cache non mis à jour après l'import d'un lot : {e}")
+        if len(report['cache_errors']) < MAX_REPORTED_ERRORS:
+            report['cache_errors'].append({'lines': [rows[0][0], rows[-1][0]], 'error': str(e)})
+
+
+def _load_record(record):
+    return json.loads(record) if isinstance(record, str) else record
+
+
+def _parse_product(record):
+    record = _load_record(record)
+    name = (record.get('name') or '').strip()
+    sku = (record.get('sku') or '').strip()
+    price = float(record.get('price') or 0)
+    if not name or not sku or price <= 0:
+        raise ValueError("A product must have a name, SKU and price.")
+    product = {'name': name, 'sku': sku, 'price': price}
+    quantity = record.get('quantity')
+    if quantity not in (None, ''):
+        product['quantity'] = _parse_quantity(quantity)
+    return product
+
+
+def _parse_stock(record):
+    record = _load_record(record)
+    return {'product_id': int(record['product_id']), 'quantity': _parse_quantity(record.get('quantity'))}
+
+
+def _parse_quantity(quantity):
+    quantity = int(quantity)
+    if quantity < 0:
+        raise ValueError("Quantity cannot be negative.")
+    return quantity
+
+
+def _write_products(rows, report):
+    # Un SKU répété dans le même lot : la dernière ligne l'emporte
+    products = {product['sku']: product for _, product in rows}
+    session = get_sqlalchemy_session()
+    try:
+        statement = insert(Product.__table__).values([
+            {'name': product['name'], 'sku': product['sku'], 'price': product['price']}
+            for product in products.values()
+        ])
+        session.execute(statement.on_duplicate_key_update(
+            name=statement.inserted.name,
+            price=statement.inserted.price
+        ))
+        ids_by_sku = dict(session.query(Product.sku, Product.id).filter(Product.sku.in_(list(products))).all())
+
+        stocks = [
+            {'product_id': ids_by_sku[sku], 'quantity': product['quantity']}
+            for sku, product in products.items() if 'quantity' in product
+        ]
+        if stocks:
+            _upsert_stocks(session, stocks)
+        quantities = dict(
+            session.query(Stock.product_id, Stock.quantity)
+            .filter(Stock.product_id.in_(list(ids_by_sku.values())))
+            .all()
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erreur d'import d'un lot de produits : {e}")
+        for line_number, _ in rows:
+            _reject(report, line_number, e)
+        return
+    finally:
+        session.close()
+
+    report['imported'] += len(rows)
+    _refresh_cache(report, rows, lambda: product_cache.invalidate_many(ids_by_sku.values()))
+    # Seuls les produits qui ont un stock ont une clé stock:* (comme ailleurs)
+    # Une quantité importée remplace celle de Redis ; sinon celle de Redis (réservations en cours) est gardée
+    _refresh_cache(report, rows, lambda: _warm_redis([
+        (ids_by_sku[sku], product['name'], sku, product['price'], quantities[ids_by_sku[sku]], 'quantity' in product)
+        for sku, product in products.items() if ids_by_sku[sku] in quantities
+    ]))
+
+
+def _write_stocks(rows, report):
+    stocks = {stock['product_id']: stock for _, stock in rows}
+    products = {}
+    session = get_sqlalchemy_session()
+    try:
+        products = {
+            product.id: product
+            for product in session.query(Product.id, Product.name, Product.sku, Product.price)
+            .filter(Product.id.in_(list(stocks)))
+            .all()
+        }
+        for line_number, stock in rows:
+            if stock['product_id'] not in products:
+                _reject(report, line_number, f"Product ID {stock['product_id']} not found in database.")
+        known_stocks = [stock for product_id, stock in stocks.items() if product_id in products]
+        if known_stocks:
+            _upsert_stocks(session, known_stocks)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erreur d'import d'un lot de stocks : {e}")
+        for line_number, stock in rows:
+            if not products or stock['product_id'] in products:
+                _reject(report, line_number, e)
+        return
+    finally:
+        session.close()
+
+    report['imported'] += sum(1 for _, stock in rows if stock['product_id'] in products)
+    _refresh_cache(report, rows, lambda: _warm_redis([
+        (product_id, products[product_id].name, products[product_id].sku, products[product_id].price, stock['quantity'], True)
+        for product_id, stock in stocks.items() if product_id in products
+    ]))
+
+
+def _upsert_stocks(session, stocks):
+    """Insert or replace stock levels with one multi-row statement"""
+    statement = insert(Stock.__table__).values(stocks)
+    session.execute(statement.on_duplicate_key_update(quantity=statement.inserted.quantity))
+
+
+def _warm_redis(products):
+    """
+    Write the stock:* hashes of a chunk in one pipeline. Product metadata is overwritten; the quantity is
+    overwritten only when the import set it, otherwise it is written only if the key has none (HSETNX).
+    """
+    if not products:
+        return
+    pipeline = get_redis_conn().pipeline(transaction=False)
+    for product_id, name, sku, price, quantity, quantity_imported in products:
+        key = f"stock:{product_id}"
+        pipeline.hset(key, mapping={
+            "product_name": name,
+            "product_sku": sku,
+            "product_unit_price": float(price)
+        })
+        if quantity_imported:
+            pipeline.hset(key, "quantity", quantity)
+        else:
+            pipeline.hsetnx(key, "quantity", quantity)
+    pipeline.execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import products or stock levels from an NDJSON or CSV file")
+    parser.add_argument('kind', choices=('products', 'stocks'))
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=FORMATS, help="Default: from the file extension")
+    parser.add_argument('--chunk-size', type=int, default=config.IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ('csv' if args.path.lower().endswith('.csv') else 'ndjson')
+    import_records = import_products if args.kind == 'products' else import_stocks
+    with open(args.path, encoding='utf-8', newline='') as text_stream:
+        report = import_records(iter_records(text_stream, fmt), args.chunk_size)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
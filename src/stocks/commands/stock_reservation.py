@@ -0,0 +1,207 @@
+"""
+Product stocks reservation in Redis (write-only model)
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+import config
+from db import get_redis_conn, get_sqlalchemy_session
+from stocks.models.product import Product
+from stocks.models.stock import Stock
+
+RESERVATION_KEY = "reservation:{}"
+RELEASED = "released"
+COMMITTED_PREFIX = "committed;"
+
+# Statuts renvoyés par reserve_items_in_redis
+RESERVED = "RESERVED"      # le stock vient d'être réservé
+PENDING = "PENDING"        # réservé par un essai précédent, mais la décrémentation MySQL n'a pas été confirmée
+COMMITTED = "COMMITTED"    # réservé et décrémenté dans MySQL par un essai précédent
+ALREADY_RELEASED = "RELEASED"  # la réservation a déjà été rendue (compensation)
+SHORT = "SHORT"            # stock insuffisant, rien n'est réservé
+MISSING = "MISSING"        # des produits ne sont pas dans Redis, rien n'est réservé
+
+# Vérifie et décrémente toutes les lignes d'une commande de manière atomique (Redis exécute un script à la fois).
+# KEYS : reservation:<order_id>, puis stock:<product_id> ; ARGV : TTL du marqueur, quantités réservées
+# encodées "product_id:quantité,...", valeur "released", préfixe "committed;", puis les quantités demandées.
+# Le marqueur rend la réservation idempotente : un OrderCreated relivré ne décrémente pas deux fois,
+# et son état (réservé, confirmé dans MySQL, rendu) est renvoyé au handler.
+# Retourne {statut, {index, présent (1/0), quantité disponible, ...}}.
+# Rien n'est décrémenté (et aucun marqueur n'est posé) si un produit manque ou est insuffisant.
+RESERVE_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    if existing == ARGV[3] then
+        return {'RELEASED', {}}
+    elseif string.sub(existing, 1, #ARGV[4]) == ARGV[4] then
+        return {'COMMITTED', {}}
+    end
+    return {'PENDING', {}}
+end
+local short = {}
+local missing = false
+for i = 2, #KEYS do
+    local available = tonumber(redis.call('HGET', KEYS[i], 'quantity'))
+    local requested = tonumber(ARGV[i + 3])
+    if available == nil then
+        missing = true
+        table.insert(short, i - 1)
+        table.insert(short, 0)
+        table.insert(short, 0)
+    elseif available < requested then
+        table.insert(short, i - 1)
+        table.insert(short, 1)
+        table.insert(short, available)
+    end
+end
+if missing then
+    return {'MISSING', short}
+elseif #short > 0 then
+    return {'SHORT', short}
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+for i = 2, #KEYS do
+    redis.call('HINCRBY', KEYS[i], 'quantity', -tonumber(ARGV[i + 3]))
+end
+return {'RESERVED', {}}
+"""
+
+# Marque la réservation comme confirmée dans MySQL (une fois la transaction de décrémentation commitée).
+COMMIT_SCRIPT = """
+local reserved = redis.call('GET', KEYS[1])
+if not reserved or reserved == ARGV[1] or string.sub(reserved, 1, #ARGV[2]) == ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2] .. reserved, 'KEEPTTL')
+return 1
+"""
+
+# Rend le stock réservé par une commande, d'après son marqueur (une seule fois : le marqueur passe à "released"
+# et garde son TTL, pour qu'un OrderCreated relivré après la compensation ne réserve pas à nouveau).
+# Retourne 2 si la réservation avait été confirmée dans MySQL, 1 si elle ne l'était pas, 0 s'il n'y avait rien à rendre.
+# Les clés stock:* sont lues dans le marqueur : ce script suppose une instance Redis unique (pas de cluster).
+RELEASE_SCRIPT = """
+local reserved = redis.call('GET', KEYS[1])
+if not reserved or reserved == ARGV[1] then
+    return 0
+end
+for product_id, quantity in string.gmatch(reserved, '(%d+):(%d+)') do
+    local key = 'stock:' .. product_id
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('HINCRBY', key, 'quantity', tonumber(quantity))
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'KEEPTTL')
+if string.sub(reserved, 1, #ARGV[2]) == ARGV[2] then
+    return 2
+end
+return 1
+"""
+
+_scripts = None
+
+
+def _get_scripts(r):
+    """ Register the Lua scripts once; redis-py then calls them with EVALSHA (and reloads them on NOSCRIPT) """
+    global _scripts
+    if _scripts is None:
+        _scripts = (
+            r.register_script(RESERVE_SCRIPT),
+            r.register_script(COMMIT_SCRIPT),
+            r.register_script(RELEASE_SCRIPT)
+        )
+    return _scripts
+
+
+def _quantities_by_product(order_items):
+    """ Sum requested quantities per product, sorted by product_id """
+    quantities = {}
+    for item in order_items:
+        product_id = int(item['product_id'])
+        quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+    return dict(sorted(quantities.items()))
+
+
+def reserve_items_in_redis(order_id, order_items):
+    """
+    Check and decrement the stock of every item of an order in Redis, in one atomic round trip.
+    Returns (status, short_items): short_items lists the items that are short or missing ({product_id, requested, available}),
+    with available set to None when the product is not in Redis. Stock is only decremented when the status is RESERVED.
+    """
+    quantities = _quantities_by_product(order_items)
+    if not quantities:
+        return RESERVED, []
+    r = get_redis_conn()
+    reserve_script, _, _ = _get_scripts(r)
+    product_ids = list(quantities)
+    status, result = reserve_script(
+        keys=[RESERVATION_KEY.format(order_id)] + [f"stock:{product_id}" for product_id in product_ids],
+        args=[
+            config.STOCK_RESERVATION_TTL_SECONDS,
+            ",".join(f"{product_id}:{quantity}" for product_id, quantity in quantities.items()),
+            RELEASED,
+            COMMITTED_PREFIX
+        ] + [quantities[product_id] for product_id in product_ids],
+        client=r
+    )
+    short_items = []
+    for i in range(0, len(result), 3):
+        product_id = product_ids[int(result[i]) - 1]
+        short_items.append({
+            'product_id': product_id,
+            'requested': quantities[product_id],
+            'available': int(result[i + 2]) if int(result[i + 1]) else None
+        })
+    return status, short_items
+
+
+def seed_stocks_in_redis(product_ids):
+    """
+    Write the stock:* hashes of products that are not in Redis yet, from MySQL (HSETNX: nothing is overwritten).
+    Returns the ids of the products that have no stock in MySQL either.
+    """
+    product_ids = [int(product_id) for product_id in product_ids]
+    if not product_ids:
+        return []
+    session = get_sqlalchemy_session()
+    try:
+        rows = session.query(
+            Stock.product_id,
+            Stock.quantity,
+            Product.name,
+            Product.sku,
+            Product.price
+        ).join(Product, Product.id == Stock.product_id)\
+         .filter(Stock.product_id.in_(product_ids))\
+         .all()
+    finally:
+        session.close()
+
+    pipeline = get_redis_conn().pipeline(transaction=False)
+    for row in rows:
+        key = f"stock:{row.product_id}"
+        pipeline.hsetnx(key, "product_name", row.name)
+        pipeline.hsetnx(key, "product_sku", row.sku)
+        pipeline.hsetnx(key, "product_unit_price", float(row.price))
+        pipeline.hsetnx(key, "quantity", row.quantity)
+    pipeline.execute()
+    found = {row.product_id for row in rows}
+    return [product_id for product_id in product_ids if product_id not in found]
+
+
+def mark_reservation_committed(order_id):
+    """ Record that the stock reserved for an order was also decremented in MySQL """
+    r = get_redis_conn()
+    _, commit_script, _ = _get_scripts(r)
+    return bool(commit_script(keys=[RESERVATION_KEY.format(order_id)], args=[RELEASED, COMMITTED_PREFIX], client=r))
+
+
+def release_items_in_redis(order_id):
+    """
+    Give back the stock reserved for an order by reserve_items_in_redis (compensation), at most once.
+    Returns COMMITTED if the reservation had been decremented in MySQL too (the caller must give it back there as well),
+    RESERVED if it was only reserved in Redis, or None if there was nothing to release.
+    """
+    r = get_redis_conn()
+    _, _, release_script = _get_scripts(r)
+    released = release_script(keys=[RESERVATION_KEY.format(order_id)], args=[RELEASED, COMMITTED_PREFIX], client=r)
+    return {2: COMMITTED, 1: RESERVED}.get(int(released))
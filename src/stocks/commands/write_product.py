@@ -6,6 +6,7 @@ Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 
 from stocks.models.product import Product
 from db import get_sqlalchemy_session
+from stocks.queries.read_product import product_cache
 
 def add_product(name: str, sku: str, price: float):
     """Insert product with items in MySQL"""
@@ -19,6 +20,7 @@ def add_product(name: str, sku: str, price: float):
         session.add(new_product)
         session.flush() 
         session.commit()
+        product_cache.invalidate(new_product.id)
         return new_product.id
     except Exception as e:
         session.rollback()
@@ -35,6 +37,7 @@ def delete_product(product_id: int):
         if product:
             session.delete(product)
             session.commit()
+            product_cache.invalidate(product_id)
             return 1  
         else:
             return 0  
@@ -41,119 +41,118 @@ def set_stock_for_product(product_id, quantity):
     finally:
         session.close()
     
+def _get_item_values(item):
+    """ Get (product_id, quantity) from an OrderItem object or a dict """
+    if hasattr(item, 'product_id'):
+        return item.product_id, item.quantity
+    return item['product_id'], item['quantity']
+
 def update_stock_mysql(session, order_items, operation):
-    """ Update stock quantities in MySQL according to a given operation (+/-) """
-    try:
-        for item in order_items:
-            if hasattr(order_items[0], 'product_id'):
-                pid = item.product_id
-                qty = item.quantity
-            else:
-                pid = item['product_id']
-                qty = item['quantity']
-            session.execute(
-                text(f"""
-                    UPDATE stocks 
-                    SET quantity = quantity {operation} :qty 
-                    WHERE product_id = :pid
-                """),
-                {"pid": pid, "qty": qty}
-            )
-    except Exception as e:
-        raise e
+    """ Update stock quantities in MySQL according to a given operation (+/-), in a single UPDATE for the whole order """
+    if operation not in ('+', '-'):
+        raise ValueError(f"Unknown stock operation: {operation}")
+    sign = 1 if operation == '+' else -1
+
+    deltas = {}
+    for item in order_items:
+        pid, qty = _get_item_values(item)
+        deltas[int(pid)] = deltas.get(int(pid), 0) + sign * int(qty)
+    if not deltas:
+        return
+
+    # Verrouiller les lignes toujours dans le même ordre (product_id) évite les deadlocks entre sagas concurrentes
+    product_ids = sorted(deltas)
+    id_params = {f"pid{i}": pid for i, pid in enumerate(product_ids)}
+    id_list = ", ".join(f":pid{i}" for i in range(len(product_ids)))
+    rows = session.execute(
+        text(f"""
+            SELECT product_id, quantity
+            FROM stocks
+            WHERE product_id IN ({id_list})
+            ORDER BY product_id
+            FOR UPDATE
+        """),
+        id_params
+    ).fetchall()
+    current_stock = {row.product_id: row.quantity for row in rows}
+
+    if operation == '-':
+        insufficient = [
+            pid for pid in product_ids
+            if current_stock.get(pid, 0) + deltas[pid] < 0
+        ]
+        if insufficient:
+            raise ValueError(f"Insufficient stock for product IDs: {insufficient}")
+
+    delta_params = {f"qty{i}": deltas[pid] for i, pid in enumerate(product_ids)}
+    cases = " ".join(f"WHEN :pid{i} THEN :qty{i}" for i in range(len(product_ids)))
+    session.execute(
+        text(f"""
+            UPDATE stocks
+            SET quantity = quantity + CASE product_id {cases} ELSE 0 END
+            WHERE product_id IN ({id_list})
+        """),
+        {**id_params, **delta_params}
+    )
     
 def check_out_items_from_stock(session, order_items):
-    """ Decrease stock quantities in Redis """
+    """ Decrease stock quantities in MySQL, or raise ValueError without changing anything if stock is insufficient """
     update_stock_mysql(session, order_items, "-")
     
 def check_in_items_to_stock(session, order_items):
-    """ Increase stock quantities in Redis """
+    """ Increase stock quantities in MySQL """
     update_stock_mysql(session, order_items, "+")
 
-def update_stock_redis(order_items, operation):
-    """ Update stock quantities in Redis """
-    if not order_items:
-        return
-    r = get_redis_conn()
-    product_ids = []
-    stock_keys = list(r.scan_iter("stock:*"))
-    if stock_keys:
-        pipeline = r.pipeline()
-        for order_item in order_items:
-            if hasattr(order_item, 'product_id'):
-                product_ids.append(order_item.product_id)
-            else:
-                product_ids.append(order_item['product_id'])
-            
-        session = get_sqlalchemy_session()
-        products_query = session.query(
-                Product.id,
+def populate_redis_from_mysql(redis_conn, chunk_size=1000, on_progress=None):
+    """
+    Write every stock:* hash from MySQL (quantity and product metadata), one keyset chunk and one pipeline at a time.
+    Product metadata is overwritten with MySQL values, but the quantity is only written if the key has none:
+    a quantity already in Redis counts reservations that MySQL does not see yet.
+    on_progress(count) is called after each chunk.
+    Returns the number of products written.
+    """
+    session = get_sqlalchemy_session()
+    try:
+        written = 0
+        after = None
+        while True:
+            query = session.query(
+                Stock.product_id,
+                Stock.quantity,
                 Product.name,
                 Product.sku,
                 Product.price
-            ).filter(Product.id.in_(product_ids))\
-            .all()
-        
-        for order_item in order_items:
-            if hasattr(order_item, 'product_id'):
-                product_id = order_item.product_id
-                quantity = order_item.quantity
-            else:
-                product_id = order_item['product_id']
-                quantity = order_item['quantity']
-
-            current_stock = r.hget(f"stock:{product_id}", "quantity")
-            current_stock = int(current_stock) if current_stock else 0
-            
-            if operation == '+':
-                new_quantity = current_stock + quantity
-            else:  
-                new_quantity = current_stock - quantity
+            ).join(Product, Product.id == Stock.product_id)\
+             .order_by(Stock.product_id)
+            if after is not None:
+                query = query.filter(Stock.product_id > after)
+            rows = query.limit(chunk_size).all()
+            if not rows:
+                break
 
-            order_item_product = {}
-            for product in products_query:
-                if product[0] == product_id:
-                    order_item_product['name'] = product[1] 
-                    order_item_product['sku'] = product[2] 
-                    order_item_product['unit_price'] = product[3] 
+            pipeline = redis_conn.pipeline(transaction=False)
+            for row in rows:
+                key = f"stock:{row.product_id}"
+                pipeline.hset(key, mapping={
+                    "product_name": row.name,
+                    "product_sku": row.sku,
+                    "product_unit_price": float(row.price)
+                })
+                pipeline.hsetnx(key, "quantity", row.quantity)
+            pipeline.execute()
 
-            pipeline.hset(f"stock:{product_id}", mapping={ 
-                "product_name": order_item_product['name'], 
-                "product_sku": order_item_product['sku'], 
-                "product_unit_price": order_item_product['unit_price'], 
-                "quantity": new_quantity 
-            })
-        
-        pipeline.execute()
-    
-    else:
-        populate_redis_from_mysql(r)
+            written += len(rows)
+            after = rows[-1].product_id
+            session.expunge_all()
+            if on_progress:
+                on_progress(written)
+            if len(rows) < chunk_size:
+                break
 
-def populate_redis_from_mysql(redis_conn):
-    """ Helper function to populate Redis from MySQL stocks table """
-    session = get_sqlalchemy_session()
-    try:
-        stocks_in_mysql = session.execute(
-            text("SELECT product_id, quantity FROM stocks")
-        ).fetchall()
-        stocks_in_redis = redis_conn.keys(f"stock:*")
-        if not len(stocks_in_mysql) or len(stocks_in_redis) > 0:
-            logger.debug("Il n'est pas nécessaire de synchronisér le stock MySQL avec Redis")
-            return
-        
-        pipeline = redis_conn.pipeline()
-        
-        for product_id, quantity in stocks_in_mysql:
-            pipeline.hset(
-                f"stock:{product_id}", 
-                mapping={ "quantity": quantity }
-            )
-        
-        pipeline.execute()
-        logger.debug(f"{len(stocks_in_mysql)} enregistrements de stock ont été synchronisés avec Redis")
-        
+        logger.debug(f"{written} enregistrements de stock ont été synchronisés avec Redis")
+        return written
     except Exception as e:
         logger.debug(f"Erreur de synchronisation: {e}")
         raise e
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
@@ -0,0 +1,21 @@
+"""
+Catalog import controller (shared by the product and stock controllers)
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import io
+from flask import jsonify
+from stocks.commands.import_catalog import FORMATS, iter_records
+
+def import_catalog_from_request(request, import_records):
+    """Parse the request body incrementally (?format=csv|ndjson, or from the Content-Type) and import it"""
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        text_stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+        report = import_records(iter_records(text_stream, fmt))
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
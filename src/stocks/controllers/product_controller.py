@@ -5,6 +5,8 @@ Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
 from flask import jsonify
+from stocks.commands.import_catalog import import_products
+from stocks.controllers.import_controller import import_catalog_from_request
 from stocks.commands.write_product import add_product, delete_product
 from stocks.queries.read_product import get_product_by_id
 
@@ -36,4 +38,8 @@ def get_product(product_id):
         product = get_product_by_id(product_id)
         return jsonify(product), 201
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def import_products_from_request(request):
+    """Bulk import products from an NDJSON or CSV body, read as a stream"""
+    return import_catalog_from_request(request, import_products)
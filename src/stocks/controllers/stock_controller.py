@@ -4,10 +4,15 @@ SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
-from db import get_redis_conn
-from flask import jsonify
-from stocks.queries.read_stock import get_stock_by_id, get_stock_for_all_products
-from stocks.commands.write_stock import populate_redis_from_mysql, set_stock_for_product
+import json
+from flask import jsonify, Response, stream_with_context
+from stocks.queries.read_stock import get_stock_by_id, get_stock_for_all_products, get_stock_page, iter_stock_for_all_products
+from stocks.commands.write_stock import set_stock_for_product
+from stocks.commands.import_catalog import import_stocks
+from stocks.controllers.import_controller import import_catalog_from_request
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
 def set_stock(request):
     """Set stock quantities of a product"""
@@ -20,6 +25,10 @@ def set_stock(request):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def import_stock(request):
+    """Bulk import stock levels from an NDJSON or CSV body, read as a stream"""
+    return import_catalog_from_request(request, import_stocks)
+
 def get_stock(product_id):
     """Get stock quantities of a product"""
     try:
@@ -28,10 +37,28 @@ def get_stock(product_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
-def get_stock_overview():
-    """Get stock for all products"""
-    return get_stock_for_all_products()
+def get_stock_overview(request):
+    """
+    Get stock for all products.
+    ?limit=N&after=<product_id> returns one page and the cursor of the next one.
+    ?stream=ndjson (one product per line) or ?stream=json (chunked JSON array) streams the whole catalog.
+    """
+    stream = request.args.get('stream')
+    if stream == 'ndjson':
+        rows = (json.dumps(row, ensure_ascii=False) + "\n" for row in iter_stock_for_all_products())
+        return Response(stream_with_context(rows), mimetype='application/x-ndjson')
+    if stream == 'json':
+        return Response(stream_with_context(_stream_json_array(iter_stock_for_all_products())), mimetype='application/json')
+
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', type=int)
+    if after is None and limit is None:
+        return jsonify(get_stock_for_all_products())
+    limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    return jsonify(get_stock_page(after, limit))
 
-def populate_redis_on_startup():
-    r = get_redis_conn()
-    populate_redis_from_mysql(r)
\ No newline at end of file
+def _stream_json_array(rows):
+    yield "["
+    for i, row in enumerate(rows):
+        yield ("," if i else "") + json.dumps(row, ensure_ascii=False)
+    yield "]"
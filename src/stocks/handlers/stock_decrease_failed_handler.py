@@ -4,9 +4,9 @@ SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 from typing import Dict, Any
-import config
 from event_management.base_handler import EventHandler
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
 from db import get_sqlalchemy_session
 from payments.models.outbox import Outbox
 from payments.outbox_processor import OutboxProcessor
@@ -15,7 +15,6 @@ class StockDecreaseFailedHandler(EventHandler):
     """Handles StockDecreaseFailed events"""
     
     def __init__(self):
-        self.order_producer = OrderEventProducer()
         super().__init__()
     
     def get_event_type(self) -> str:
@@ -28,9 +27,9 @@ class StockDecreaseFailedHandler(EventHandler):
         try:
             # Si l'operation a réussi, déclenchez OrderCancelled.
             event_data['event'] = "OrderCancelled"
-            OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
         except Exception as e:
             # Si l'operation a échoué, continuez la compensation des étapes précedentes.
             event_data['event'] = "OrderCreationFailed"
             event_data['error'] = str(e)
-            OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
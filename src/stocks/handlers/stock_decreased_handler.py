@@ -4,9 +4,9 @@ SPDX-License-Identifier: LGPL-3.0-or-later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 from typing import Dict, Any
-import config
 from event_management.base_handler import EventHandler
 from orders.commands.order_event_producer import OrderEventProducer
+from event_management.topics import get_event_topic
 from db import get_sqlalchemy_session
 from payments.models.outbox import Outbox
 from payments.outbox_processor import OutboxProcessor
@@ -16,7 +16,6 @@ class StockDecreasedHandler(EventHandler):
     """Handles StockDecreased events"""
     
     def __init__(self):
-        self.order_producer = OrderEventProducer()
         super().__init__()
     
     def get_event_type(self) -> str:
@@ -40,6 +39,6 @@ class StockDecreasedHandler(EventHandler):
             self.logger.debug("La création d'une transaction de paiement a échoué : " + str(e))
             event_data['event'] = "PaymentCreationFailed"
             event_data['error'] = str(e)
-            OrderEventProducer().get_instance().send(config.KAFKA_TOPIC, value=event_data)
+            OrderEventProducer().get_instance().send(get_event_topic(event_data), value=event_data, durable=True)
         finally:
             session.close()
@@ -4,12 +4,18 @@ SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
-from db import get_sqlalchemy_session
+from cache import ReadThroughCache
+from db import get_scoped_session
 from stocks.models.product import Product
 
+product_cache = ReadThroughCache("product")
+
 def get_product_by_id(product_id):
-    """Get product by ID """
-    session = get_sqlalchemy_session()
+    """Get product by ID (read-through cache)"""
+    return product_cache.get(product_id, lambda: _get_product_from_mysql(product_id))
+
+def _get_product_from_mysql(product_id):
+    session = get_scoped_session()
     result = session.query(Product).filter_by(id=product_id).all()
 
     if len(result):
@@ -21,5 +27,3 @@ def get_product_by_id(product_id):
         }
     else:
         return {}
-
-
@@ -4,13 +4,13 @@ SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
 
-from db import get_sqlalchemy_session
+from db import get_scoped_session, get_sqlalchemy_session
 from stocks.models.product import Product
 from stocks.models.stock import Stock
 
 def get_stock_by_id(product_id):
     """Get stock by product ID """
-    session = get_sqlalchemy_session()
+    session = get_scoped_session()
     result = session.query(Stock).filter_by(product_id=product_id).all()
     if len(result):
         return {
@@ -20,23 +20,62 @@ def get_stock_by_id(product_id):
     else:
         return {}
 
-def get_stock_for_all_products():
-    """Get stock quantity for all products"""
-    session = get_sqlalchemy_session()
-    results = session.query(
+def _query_stock_overview(session, after=None, limit=None):
+    """Build the stocks-join-products query, ordered by product_id so it can be paginated with a keyset cursor"""
+    query = session.query(
         Stock.product_id,
         Stock.quantity,
         Product.name,
         Product.sku,
         Product.price
-    ).join(Product, Product.id == Stock.product_id).all()
+    ).join(Product, Product.id == Stock.product_id)\
+     .order_by(Stock.product_id)
+    if after is not None:
+        query = query.filter(Stock.product_id > after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def _to_stock_overview(row):
+    return {
+        'Article': row.name,
+        'Numéro SKU': row.sku,
+        'Prix unitaire': float(row.price),
+        'Unités en stock': int(row.quantity),
+    }
+
+def get_stock_for_all_products():
+    """Get stock quantity for all products"""
+    session = get_scoped_session()
+    results = _query_stock_overview(session).all()
     stock_data = []
     for row in results:
-        stock_data.append({
-            'Article': row.name,
-            'Numéro SKU': row.sku,
-            'Prix unitaire': float(row.price),
-            'Unités en stock': int(row.quantity),
-        })
+        stock_data.append(_to_stock_overview(row))
     
     return stock_data
+
+def get_stock_page(after=None, limit=100):
+    """Get one page of the stock overview. Pass next_after as the after parameter to get the next page."""
+    session = get_scoped_session()
+    results = _query_stock_overview(session, after, limit).all()
+    return {
+        'items': [_to_stock_overview(row) for row in results],
+        'next_after': results[-1].product_id if len(results) == limit else None
+    }
+
+def iter_stock_for_all_products(chunk_size=500):
+    """Yield the stock overview of every product, one chunk at a time, so memory stays flat whatever the catalog size"""
+    session = get_sqlalchemy_session()
+    try:
+        after = None
+        while True:
+            results = _query_stock_overview(session, after, chunk_size).all()
+            for row in results:
+                yield _to_stock_overview(row)
+            if len(results) < chunk_size:
+                return
+            after = results[-1].product_id
+            # Libérer les lignes déjà envoyées avant de lire le prochain chunk
+            session.expunge_all()
+    finally:
+        session.close()
@@ -0,0 +1,105 @@
+from graphql import FieldNode
+from graphql.utilities import value_from_ast_untyped
+from db import get_redis_conn, get_sqlalchemy_session
+from stocks.models.product import Product
+from stocks.models.stock import Stock
+
+PRODUCT_FIELDS = ('product_name', 'product_sku', 'product_unit_price', 'quantity')
+
+class ProductLoader:
+    """
+    Per-request loader for product stock data (DataLoader-style).
+    On first use, it collects the ids requested by every product/products/stockLevel field of the query,
+    fetches them all with one Redis pipeline, and falls back to a single MySQL IN query for the misses.
+    """
+
+    def __init__(self):
+        self._products = {}
+        self._primed = False
+
+    def prime(self, info) -> None:
+        """ Fetch, in one batch, every id requested at the root of the operation """
+        if self._primed:
+            return
+        self._primed = True
+        ids = []
+        for selection in info.operation.selection_set.selections:
+            if not isinstance(selection, FieldNode):
+                continue
+            for argument in selection.arguments:
+                if selection.name.value in ('product', 'stockLevel') and argument.name.value in ('id', 'productId'):
+                    ids.append(value_from_ast_untyped(argument.value, info.variable_values))
+                elif selection.name.value == 'products' and argument.name.value == 'ids':
+                    ids.extend(value_from_ast_untyped(argument.value, info.variable_values) or [])
+        self.load_many([product_id for product_id in ids if product_id is not None])
+
+    def load(self, product_id):
+        """ Get the data of one product, or None if it does not exist """
+        return self.load_many([product_id])[0]
+
+    def load_many(self, product_ids):
+        """ Get the data of several products, in the same order (None for products that do not exist) """
+        product_ids = [str(product_id) for product_id in product_ids]
+        missing = list(dict.fromkeys(product_id for product_id in product_ids if product_id not in self._products))
+        if missing:
+            self._fetch(missing)
+        return [self._products.get(product_id) for product_id in product_ids]
+
+    def _fetch(self, product_ids):
+        redis_client = get_redis_conn()
+        pipeline = redis_client.pipeline(transaction=False)
+        for product_id in product_ids:
+            pipeline.hgetall(f"stock:{product_id}")
+        misses = {}
+        for product_id, product_data in zip(product_ids, pipeline.execute()):
+            if all(field in product_data for field in PRODUCT_FIELDS):
+                self._products[product_id] = product_data
+            else:
+                misses[product_id] = product_data
+        if misses:
+            self._fetch_from_mysql(redis_client, misses)
+
+    def _fetch_from_mysql(self, redis_client, misses):
+        """
+        Load the Redis misses with one query, then put back in Redis only the fields that are missing.
+        The Redis quantity (if any) is kept: it already counts the reservations that MySQL does not see yet.
+        """
+        product_ids = list(misses)
+        numeric_ids = [int(product_id) for product_id in product_ids if product_id.isdigit()]
+        for product_id in product_ids:
+            self._products[product_id] = None
+        if not numeric_ids:
+            return
+
+        session = get_sqlalchemy_session()
+        try:
+            rows = session.query(
+                Product.id,
+                Product.name,
+                Product.sku,
+                Product.price,
+                Stock.quantity
+            ).outerjoin(Stock, Stock.product_id == Product.id)\
+             .filter(Product.id.in_(numeric_ids))\
+             .all()
+        finally:
+            session.close()
+
+        pipeline = redis_client.pipeline(transaction=False)
+        for row in rows:
+            product_data = {
+                'product_name': row.name,
+                'product_sku': row.sku,
+                'product_unit_price': row.price,
+                'quantity': row.quantity or 0
+            }
+            cached_data = misses.get(str(row.id), {})
+            self._products[str(row.id)] = {**product_data, **cached_data}
+            # Seuls les produits qui ont un stock sont mis en cache (comme les autres clés stock:*)
+            if row.quantity is not None:
+                key = f"stock:{row.id}"
+                for field, value in product_data.items():
+                    if field not in cached_data:
+                        # HSETNX : une quantité écrite entre-temps (réservation, import) n'est pas écrasée
+                        pipeline.hsetnx(key, field, value)
+        pipeline.execute()
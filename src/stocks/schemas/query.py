@@ -1,28 +1,44 @@
 import graphene
 from graphene import ObjectType, String, Int
 from stocks.schemas.product import Product
-from db import get_redis_conn
+from stocks.schemas.product_loader import ProductLoader
 
-class Query(ObjectType):       
+class Query(ObjectType):
     product = graphene.Field(Product, id=String(required=True))
+    products = graphene.List(Product, ids=graphene.List(String, required=True))
     stock_level = Int(product_id=String(required=True))
-    
+
     def resolve_product(self, info, id):
         """ Create an instance of Product based on stock info for that product that is in Redis """
-        redis_client = get_redis_conn()
-        product_data = redis_client.hgetall(f"stock:{id}")
-        if product_data:
-            return Product(
-                id=id,
-                name=product_data['product_name'],
-                sku=product_data['product_sku'],
-                price=float(product_data['product_unit_price']),
-                quantity=int(product_data['quantity'])
-            )
-        return None
-    
+        return _to_product(id, _get_loader(info).load(id))
+
+    def resolve_products(self, info, ids):
+        """ Create the instances of Product for several ids, fetched in one batch """
+        products = _get_loader(info).load_many(ids)
+        return [_to_product(product_id, product_data) for product_id, product_data in zip(ids, products)]
+
     def resolve_stock_level(self, info, product_id):
         """ Retrieve stock quantity from Redis """
-        redis_client = get_redis_conn()
-        quantity = redis_client.hget(f"stock:{product_id}", "quantity")
-        return int(quantity) if quantity else 0
\ No newline at end of file
+        product_data = _get_loader(info).load(product_id)
+        return int(product_data['quantity']) if product_data else 0
+
+def _get_loader(info) -> ProductLoader:
+    """ Get the loader of the current request (a new one if the query was executed without context) """
+    context = info.context if isinstance(info.context, dict) else {}
+    loader = context.get('product_loader')
+    if loader is None:
+        loader = ProductLoader()
+        context['product_loader'] = loader
+    loader.prime(info)
+    return loader
+
+def _to_product(product_id, product_data):
+    if not product_data:
+        return None
+    return Product(
+        id=product_id,
+        name=product_data['product_name'],
+        sku=product_data['product_sku'],
+        price=float(product_data['product_unit_price']),
+        quantity=int(product_data['quantity'])
+    )
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from graphene import Schema
+from graphql import ExecutionResult, GraphQLError, execute, parse, validate
+
+class QueryExecutor:
+    """
+    Execute GraphQL queries against a schema built once.
+    Parsed and validated documents are kept in a bounded LRU cache keyed by query text,
+    since suppliers send the same few queries over and over.
+    """
+
+    def __init__(self, schema: Schema, cache_size: int = 128):
+        self.schema = schema
+        self.cache_size = cache_size
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def execute(self, query: str, variables: dict = None, context=None) -> ExecutionResult:
+        """ Execute a query, reusing its parsed and validated document when the same text was seen before """
+        document, errors = self._get_document(query)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+        return execute(self.schema.graphql_schema, document, variable_values=variables, context_value=context)
+
+    def _get_document(self, query: str):
+        with self._lock:
+            cached = self._documents.get(query)
+            if cached is not None:
+                self._documents.move_to_end(query)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            return None, [error]
+        cached = (document, validate(self.schema.graphql_schema, document))
+
+        with self._lock:
+            self._documents[query] = cached
+            self._documents.move_to_end(query)
+            while len(self._documents) > self.cache_size:
+                self._documents.popitem(last=False)
+                self.evictions += 1
+        return cached
+
+    def get_metrics(self) -> dict:
+        """ Hit and miss counters of the document cache """
+        with self._lock:
+            requests_count = self.hits + self.misses
+            return {
+                'size': len(self._documents),
+                'max_size': self.cache_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / requests_count, 4) if requests_count else 0.0
+            }
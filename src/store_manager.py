@@ -3,133 +3,227 @@ Order manager application
 SPDX - License - Identifier: LGPL - 3.0 - or -later
 Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 """
-import config
+import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+from flask import Flask
 from graphene import Schema
-from event_management.handler_registry import HandlerRegistry
-from orders.handlers.order_created_handler import OrderCreatedHandler
-from orders.handlers.order_creation_failed_handler import OrderCreationFailedHandler
-from orders.handlers.order_cancelled_handler import OrderCancelledHandler
-from orders.handlers.saga_completed_handler import SagaCompletedHandler
-from stocks.handlers.stock_decreased_handler import StockDecreasedHandler
-from stocks.handlers.stock_decrease_failed_handler import StockDecreaseFailedHandler
-from stocks.handlers.stock_increased_handler import StockIncreasedHandler
-from payments.handlers.payment_created_handler import PaymentCreatedHandler
-from payments.handlers.payment_creation_failed_handler import PaymentCreationFailedHandler
-from orders.queries.order_event_consumer import OrderEventConsumer
+from logger import Logger
+from db import remove_scoped_session, reset_connections
+from routes import bp
 from stocks.schemas.query import Query
-from flask import Flask, request, jsonify
-from orders.controllers.order_controller import create_order, remove_order, get_order, get_report_highest_spending_users, get_report_best_selling_products, update_order
-from orders.controllers.user_controller import create_user, remove_user, get_user
-from stocks.controllers.product_controller import create_product, remove_product, get_product
-from stocks.controllers.stock_controller import get_stock, populate_redis_on_startup, set_stock, get_stock_overview
-from payments.outbox_processor import OutboxProcessor
-
-app = Flask(__name__)
-is_outbox_processor_running = False
-if not is_outbox_processor_running:
-    OutboxProcessor().run()
-    is_outbox_processor_running = True
-
-thread = threading.Timer(10.0, populate_redis_on_startup)
-thread.daemon = True
-thread.start()
-
-registry = HandlerRegistry()
-registry.register(OrderCreatedHandler())
-registry.register(OrderCreationFailedHandler())
-registry.register(OrderCancelledHandler())
-registry.register(StockDecreasedHandler())
-registry.register(StockDecreaseFailedHandler())
-registry.register(StockIncreasedHandler())
-registry.register(PaymentCreatedHandler())
-registry.register(PaymentCreationFailedHandler())
-registry.register(SagaCompletedHandler())
-
-consumer_service = OrderEventConsumer(
-    bootstrap_servers=config.KAFKA_HOST,
-    topic=config.KAFKA_TOPIC,
-    group_id=config.KAFKA_GROUP_ID,
-    registry=registry
-)
-consumer_service.start()
-
-@app.get('/health-check')
-def health():
-    return jsonify({'status': 'ok'})
-
-@app.post('/orders')
-def post_orders():
-    return create_order(request)
-
-@app.delete('/orders/<int:order_id>')
-def delete_orders_id(order_id):
-    return remove_order(order_id)
-
-@app.post('/products')
-def post_products():
-    return create_product(request)
-
-@app.delete('/products/<int:product_id>')
-def delete_products_id(product_id):
-    return remove_product(product_id)
-
-@app.post('/users')
-def post_users():
-    return create_user(request)
-
-@app.delete('/users/<int:user_id>')
-def delete_users_id(user_id):
-    return remove_user(user_id)
-
-@app.post('/stocks')
-def post_stocks():
-    return set_stock(request)
-
-@app.get('/orders/<int:order_id>')
-def get_order_id(order_id):
-    return get_order(order_id)
-
-@app.get('/products/<int:product_id>')
-def get_product_id(product_id):
-    return get_product(product_id)
-
-@app.get('/users/<int:user_id>')
-def get_user_id(user_id):
-    return get_user(user_id)
-
-@app.get('/stocks/<int:product_id>')
-def get_stocks(product_id):
-    return get_stock(product_id)
-
-@app.get('/orders/reports/highest-spenders')
-def get_orders_highest_spending_users():
-    rows = get_report_highest_spending_users()
-    return jsonify(rows)
-
-@app.get('/orders/reports/best-sellers')
-def get_orders_report_best_selling_products():
-    rows = get_report_best_selling_products()
-    return jsonify(rows)
-
-@app.get('/stocks/reports/overview-stocks')
-def get_stocks_overview():
-    rows = get_stock_overview()
-    return jsonify(rows)
-
-@app.post('/stocks/graphql-query')
-def graphql_supplier():
-    data = request.get_json()
-    schema = Schema(query=Query)
-    result = schema.execute(data['query'], variables=data.get('variables'))
-    return jsonify({
-        'data': result.data,
-        'errors': [str(e) for e in result.errors] if result.errors else None
-    })
-
-@app.put('/orders')
-def put_orders():
-    return update_order(request)
+from stocks.schemas.query_executor import QueryExecutor
+
+logger = Logger.get_instance("store_manager")
+
+# Délai accordé au préchargement interrompu pour terminer son lot en cours (en secondes)
+WARMUP_STOP_TIMEOUT = 10
+_services_lock_file = None
+
+
+def create_app(app_config: dict = None) -> Flask:
+    """
+    Build the Flask application. Nothing connects to MySQL, Redis or Kafka here:
+    connections are opened on first use and background services are started by start_services().
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+    if app_config:
+        app.config.update(app_config)
+    app.teardown_appcontext(remove_scoped_session)
+    app.extensions['graphql_executor'] = QueryExecutor(Schema(query=Query), config.GRAPHQL_DOCUMENT_CACHE_SIZE)
+    app.extensions['background_services'] = ()
+    app.extensions['startup_times'] = {'create_app': round(time.perf_counter() - started, 4)}
+    app.register_blueprint(bp)
+    return app
+
+
+def _start_event_consumer():
+    from event_management.handler_registry import HandlerRegistry
+    from event_management.topics import get_topics_for_event_types
+    from orders.handlers.order_created_handler import OrderCreatedHandler
+    from orders.handlers.order_creation_failed_handler import OrderCreationFailedHandler
+    from orders.handlers.order_cancelled_handler import OrderCancelledHandler
+    from orders.handlers.saga_completed_handler import SagaCompletedHandler
+    from stocks.handlers.stock_decreased_handler import StockDecreasedHandler
+    from stocks.handlers.stock_decrease_failed_handler import StockDecreaseFailedHandler
+    from stocks.handlers.stock_increased_handler import StockIncreasedHandler
+    from payments.handlers.payment_created_handler import PaymentCreatedHandler
+    from payments.handlers.payment_creation_failed_handler import PaymentCreationFailedHandler
+    from orders.queries.order_event_consumer import OrderEventConsumer
+
+    registry = HandlerRegistry()
+    registry.register(OrderCreatedHandler())
+    registry.register(OrderCreationFailedHandler())
+    registry.register(OrderCancelledHandler())
+    registry.register(StockDecreasedHandler())
+    registry.register(StockDecreaseFailedHandler())
+    registry.register(StockIncreasedHandler())
+    registry.register(PaymentCreatedHandler())
+    registry.register(PaymentCreationFailedHandler())
+    registry.register(SagaCompletedHandler())
+
+    OrderEventConsumer(
+        bootstrap_servers=config.KAFKA_HOST,
+        topics=get_topics_for_event_types(registry.get_supported_events()),
+        group_id=config.KAFKA_GROUP_ID,
+        registry=registry
+    ).start()
+
+
+def _start_outbox():
+    from payments.outbox_processor import OutboxProcessor
+    OutboxProcessor().start()
+
+
+def _start_outbox_retention():
+    from payments.outbox_retention import OutboxRetention
+    OutboxRetention().start()
+
+
+def _start_warmup():
+    from stocks.cache_warmup import CacheWarmup
+    CacheWarmup().start()
+
+
+BACKGROUND_SERVICES = {
+    'warmup': _start_warmup,
+    'outbox': _start_outbox,
+    'outbox_retention': _start_outbox_retention,
+    'consumer': _start_event_consumer,
+}
+
+
+def get_background_services():
+    """Names of the background services to start, from config.BACKGROUND_SERVICES"""
+    return [name.strip() for name in config.BACKGROUND_SERVICES.split(',') if name.strip()]
+
+
+def start_services(app: Flask, services=None):
+    """
+    Start the background services (config.BACKGROUND_SERVICES by default) in parallel,
+    and log how long each one took to start.
+    """
+    if services is None:
+        services = get_background_services()
+    unknown = [name for name in services if name not in BACKGROUND_SERVICES]
+    if unknown:
+        raise ValueError(f"Unknown background services: {', '.join(unknown)}. Expected: {', '.join(BACKGROUND_SERVICES)}.")
+
+    def timed_start(name):
+        started = time.perf_counter()
+        BACKGROUND_SERVICES[name]()
+        return name, round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    startup_times = app.extensions['startup_times']
+    if services:
+        with ThreadPoolExecutor(max_workers=len(services), thread_name_prefix="ServiceStart") as executor:
+            for name, seconds in executor.map(timed_start, services):
+                startup_times[name] = seconds
+    startup_times['start_services'] = round(time.perf_counter() - started, 4)
+    app.extensions['background_services'] = tuple(services)
+    logger.info(f"Temps de démarrage (s) : {startup_times}")
+
+
+def warm_up_before_fork():
+    """
+    Warm the stock cache in the current process and wait for it (at most config.CACHE_WARMUP_TIMEOUT seconds),
+    then close its connections before workers are forked. Returns False if the warm-up did not finish in time:
+    it is stopped, and each worker then warms up on its own (its /health-check answers 503 until it is done).
+    """
+    from stocks.cache_warmup import CacheWarmup
+    started = time.perf_counter()
+    warmup = CacheWarmup()
+    warmup.start()
+    ready = warmup.wait_until_ready(config.CACHE_WARMUP_TIMEOUT or None)
+    if not ready:
+        logger.warning(f"Préchargement du cache non terminé après {config.CACHE_WARMUP_TIMEOUT} s : les workers le reprendront")
+        if not warmup.stop(WARMUP_STOP_TIMEOUT):
+            logger.warning("Le préchargement du cache ne s'est pas arrêté à temps")
+    reset_connections()
+    app.extensions['startup_times']['warmup'] = round(time.perf_counter() - started, 4)
+    return ready
+
+
+def get_worker_services():
+    """
+    Background services of a Gunicorn worker. The warm-up runs once in the master (see warm_up_before_fork):
+    a worker only warms up on its own if the master's warm-up timed out. The other services follow
+    config.GUNICORN_SERVICES_WORKERS: "one" (a single worker, the one holding the services lock),
+    "all" (every worker) or "none" (they run in a separate SERVER_MODE=services process).
+    """
+    from stocks.cache_warmup import CacheWarmup
+    mode = config.GUNICORN_SERVICES_WORKERS
+    if mode not in ('one', 'all', 'none'):
+        raise ValueError(f"Unknown GUNICORN_SERVICES_WORKERS: {mode}. Expected one, all or none.")
+    services = get_background_services()
+    worker_services = []
+    if 'warmup' in services and not CacheWarmup().is_ready():
+        worker_services.append('warmup')
+    if mode == 'all' or (mode == 'one' and _acquire_services_lock()):
+        worker_services.extend(name for name in services if name != 'warmup')
+        logger.info(f"Services d'arrière-plan démarrés dans le worker {os.getpid()}")
+    return worker_services
+
+
+def _acquire_services_lock():
+    """
+    Take the services lock without waiting. It is held until the worker exits: the worker that replaces it
+    takes the lock (and the services) when it is forked.
+    """
+    global _services_lock_file
+    import fcntl
+    lock_file = open(config.GUNICORN_SERVICES_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _services_lock_file = lock_file
+    return True
+
+
+def reset_after_fork():
+    """
+    Called in each worker right after fork: connection pools, the Kafka producer and the Payments API client
+    inherited from the master are dropped and reopened lazily by the worker.
+    The consumer and the other background threads are not inherited (threads do not survive fork): start_services restarts them.
+    """
+    from orders.commands.order_event_producer import OrderEventProducer
+    from payments.payment_client import reset_payment_client
+    from stocks.cache_warmup import CacheWarmup
+    reset_connections(in_child_process=True)
+    OrderEventProducer().reset_after_fork()
+    reset_payment_client()
+    CacheWarmup().reset_after_fork()
+
+
+def run_gunicorn():
+    """Replace the current process by Gunicorn, configured by gunicorn.conf.py"""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    os.execvp("gunicorn", [
+        "gunicorn",
+        "--chdir", src_dir,
+        "-c", os.path.join(src_dir, "gunicorn.conf.py"),
+        "store_manager:app"
+    ])
+
+
+# Conserve la compatibilité avec `from store_manager import app` (aucun service n'est démarré à l'import)
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    if config.SERVER_MODE == 'gunicorn':
+        run_gunicorn()
+    elif config.SERVER_MODE == 'development':
+        start_services(app)
+        app.run(host='0.0.0.0', port=5000)
+    elif config.SERVER_MODE == 'services':
+        # Processus dédié aux services d'arrière-plan, sans serveur HTTP (avec GUNICORN_SERVICES_WORKERS=none)
+        start_services(app)
+        threading.Event().wait()
+    else:
+        raise ValueError(f"Unknown SERVER_MODE: {config.SERVER_MODE}. Expected development, gunicorn or services.")
@@ -0,0 +1,49 @@
+"""
+Tests for the stock cache warm-up readiness gate
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import threading
+import pytest
+from singleton import Singleton
+from stocks import cache_warmup
+from stocks.cache_warmup import CacheWarmup
+from store_manager import create_app
+
+@pytest.fixture
+def release_warmup(monkeypatch):
+    """Warm-up without MySQL nor Redis: populate_redis_from_mysql waits until the test releases it"""
+    release = threading.Event()
+
+    def populate_redis_from_mysql(redis_conn, chunk_size=1000, on_progress=None):
+        release.wait(timeout=10)
+        return 3
+
+    monkeypatch.setattr(cache_warmup, 'populate_redis_from_mysql', populate_redis_from_mysql)
+    monkeypatch.setattr(cache_warmup, 'get_redis_conn', lambda: None)
+    monkeypatch.setattr(CacheWarmup, '_check_dependencies', lambda self: None)
+    # Une nouvelle instance du singleton pour ce test
+    monkeypatch.delitem(Singleton._instances, CacheWarmup, raising=False)
+    yield release
+    release.set()
+
+@pytest.fixture
+def client():
+    app = create_app({'TESTING': True})
+    app.extensions['background_services'] = ('warmup',)
+    with app.test_client() as client:
+        yield client
+
+def test_health_is_503_until_warmup_is_done(release_warmup, client):
+    CacheWarmup().start()
+    result = client.get('/health-check')
+    assert result.status_code == 503
+    assert result.get_json()['status'] == 'warming'
+
+    release_warmup.set()
+    assert CacheWarmup().wait_until_ready(timeout=5)
+    result = client.get('/health-check')
+    assert result.status_code == 200
+    assert result.get_json() == {'status': 'ok'}
+    assert CacheWarmup().get_status()['warmed'] == 3
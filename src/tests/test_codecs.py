@@ -0,0 +1,40 @@
+"""
+Tests for event codecs
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import json
+import pytest
+from event_management.codecs import get_codec, decode_event, CODEC_HEADER, CODEC_VERSION_HEADER
+
+EVENT = {
+    "event": "OrderCreated",
+    "order_id": 1,
+    "user_id": 1,
+    "total_amount": 70.99,
+    "is_paid": False,
+    "payment_link": "no-link",
+    "order_items": [{"product_id": 2, "quantity": 1}, {"product_id": 3, "quantity": 2}]
+}
+
+@pytest.mark.parametrize("name", ["json", "msgpack", "json+zlib", "msgpack+zlib"])
+def test_codec_round_trip(name):
+    codec = get_codec(name)
+    payload = codec.encode(EVENT)
+    assert decode_event(payload, codec.get_headers()) == EVENT
+
+def test_decode_message_without_headers_as_json():
+    """Messages from producers without codec headers are still readable"""
+    payload = json.dumps(EVENT).encode("utf-8")
+    assert decode_event(payload, []) == EVENT
+
+def test_decode_unsupported_codec_version():
+    codec = get_codec("json")
+    headers = [(CODEC_HEADER, b"json"), (CODEC_VERSION_HEADER, b"2")]
+    with pytest.raises(ValueError):
+        decode_event(codec.encode(EVENT), headers)
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("xml")
@@ -0,0 +1,73 @@
+"""
+Tests for the offset tracker
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import threading
+import time
+from kafka.structs import TopicPartition
+from event_management.offset_tracker import OffsetTracker
+
+TP = TopicPartition("orders", 0)
+OTHER_TP = TopicPartition("orders", 1)
+
+def make_tracker(offsets, topic_partition=TP):
+    tracker = OffsetTracker()
+    for offset in offsets:
+        tracker.track(topic_partition, offset)
+    return tracker
+
+def test_committable_is_next_offset_when_nothing_in_flight():
+    tracker = make_tracker([10, 11, 12])
+    for offset in (10, 11, 12):
+        tracker.done(TP, offset)
+    assert tracker.committable()[TP].offset == 13
+
+def test_out_of_order_done_keeps_lowest_pending_offset():
+    """A message finished before an older one must not be committed past the older one"""
+    tracker = make_tracker([10, 11, 12])
+    tracker.done(TP, 12)
+    tracker.done(TP, 11)
+    assert tracker.committable()[TP].offset == 10
+    tracker.done(TP, 10)
+    assert tracker.committable()[TP].offset == 13
+
+def test_committable_is_empty_after_mark_committed():
+    tracker = make_tracker([10])
+    tracker.done(TP, 10)
+    tracker.mark_committed(tracker.committable())
+    assert tracker.committable() == {}
+    tracker.track(TP, 11)
+    tracker.done(TP, 11)
+    assert tracker.committable()[TP].offset == 12
+
+def test_committable_filters_partitions():
+    tracker = make_tracker([10])
+    tracker.track(OTHER_TP, 5)
+    assert set(tracker.committable([OTHER_TP])) == {OTHER_TP}
+
+def test_wait_until_done_times_out_while_in_flight():
+    tracker = make_tracker([10])
+    started = time.monotonic()
+    assert not tracker.wait_until_done([TP], timeout=0.1)
+    assert time.monotonic() - started >= 0.1
+
+def test_wait_until_done_returns_when_worker_finishes():
+    tracker = make_tracker([10])
+    worker = threading.Timer(0.05, tracker.done, args=(TP, 10))
+    worker.start()
+    assert tracker.wait_until_done([TP], timeout=5)
+    worker.join()
+
+def test_wait_until_done_ignores_excluded_offsets():
+    tracker = make_tracker([10, 11])
+    tracker.done(TP, 10)
+    assert tracker.wait_until_done([TP], timeout=0.1, excluding={TP: {11}})
+    assert tracker.committable()[TP].offset == 11
+
+def test_forget_drops_partition_state():
+    tracker = make_tracker([10])
+    tracker.forget([TP])
+    assert tracker.committable() == {}
+    assert tracker.wait_until_done([TP], timeout=0)
@@ -0,0 +1,120 @@
+"""
+Tests for the Payments API client, against a local stub server
+SPDX - License - Identifier: LGPL - 3.0 - or -later
+Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from payments.payment_client import PaymentClient
+
+# Statut qui fait fermer la connexion sans réponse, après lecture de la requête
+DROP = None
+
+class StubPaymentsHandler(BaseHTTPRequestHandler):
+    """Answers with the (status, delay) queued in server.responses, then 201"""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.server.received.append(json.loads(self.rfile.read(length)))
+        self.server.idempotency_keys.append(self.headers.get('Idempotency-Key'))
+        status, delay = self.server.responses.pop(0) if self.server.responses else (201, 0)
+        if status is DROP:
+            self.close_connection = True
+            return
+        time.sleep(delay)
+        body = json.dumps({'payment_id': len(self.server.received)}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPaymentsHandler)
+    server.received = []
+    server.idempotency_keys = []
+    server.responses = []
+    # Le client peut avoir abandonné la connexion (timeout) : pas de trace dans la sortie des tests
+    server.handle_error = lambda request, client_address: None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_client(server, **kwargs):
+    options = {'connect_timeout': 1, 'read_timeout': 1, 'max_retries': 2, 'backoff': 0.01, 'pool_size': 2}
+    options.update(kwargs)
+    return PaymentClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/payments-api", **options)
+
+def test_create_payment(stub_server):
+    client = make_client(stub_server)
+    response = client.create_payment({'order_id': 1, 'user_id': 1, 'total_amount': 10.0})
+    assert response.status_code == 201
+    assert response.json() == {'payment_id': 1}
+    assert stub_server.received == [{'order_id': 1, 'user_id': 1, 'total_amount': 10.0}]
+    assert client.get_metrics()['requests'] == 1
+    assert client.get_payment_link(1).endswith("/payments-api/payments/process/1")
+
+def test_retry_when_gateway_unavailable(stub_server):
+    stub_server.responses = [(503, 0), (502, 0)]
+    client = make_client(stub_server)
+    response = client.create_payment({'order_id': 1})
+    assert response.status_code == 201
+    assert len(stub_server.received) == 3
+    assert client.get_metrics()['retries'] == 2
+
+def test_retries_are_bounded(stub_server):
+    stub_server.responses = [(503, 0)] * 5
+    client = make_client(stub_server, max_retries=1)
+    response = client.create_payment({'order_id': 1})
+    assert response.status_code == 503
+    assert len(stub_server.received) == 2
+
+def test_read_timeout_is_not_retried(stub_server):
+    """The payment may have been created, so a slow answer must not be sent twice"""
+    stub_server.responses = [(201, 0.5)]
+    client = make_client(stub_server, read_timeout=0.1)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.create_payment({'order_id': 1})
+    assert len(stub_server.received) == 1
+    assert client.get_metrics()['errors'] == 1
+
+def test_connection_refused_is_retried(stub_server):
+    """Nothing listens on the port: the request was never sent, so it is retried"""
+    port = stub_server.server_address[1]
+    stub_server.shutdown()
+    stub_server.server_close()
+    client = PaymentClient(base_url=f"http://127.0.0.1:{port}/payments-api", connect_timeout=1, read_timeout=1,
+                           max_retries=2, backoff=0.01, pool_size=2)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.create_payment({'order_id': 1})
+    assert client.get_metrics()['retries'] == 2
+
+def test_connection_lost_is_retried_with_the_same_idempotency_key(stub_server):
+    """The server closed the connection without answering: the payment is requested again with the same key"""
+    stub_server.responses = [(DROP, 0)]
+    client = make_client(stub_server)
+    response = client.create_payment({'order_id': 7})
+    assert response.status_code == 201
+    assert len(stub_server.received) == 2
+    assert stub_server.idempotency_keys == ['order-7', 'order-7']
+    assert client.get_metrics()['retries'] == 1
+
+def test_connection_lost_without_idempotency_key_is_not_retried(stub_server):
+    """Without an idempotency key, the payment may have been created, so it is not requested twice"""
+    stub_server.responses = [(DROP, 0)]
+    client = make_client(stub_server)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.create_payment({'user_id': 1})
+    assert len(stub_server.received) == 1
+    assert client.get_metrics()['retries'] == 0
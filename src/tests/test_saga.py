@@ -7,7 +7,7 @@ Auteurs : Gabriel C. Ullmann, Fabio Petrillo, 2025
 import json
 from logger import Logger
 import pytest
-from store_manager import app
+from store_manager import app, create_app, start_services
 
 @pytest.fixture
 def client():
@@ -15,12 +15,24 @@ def client():
     with app.test_client() as client:
         yield client
 
+@pytest.fixture(scope='module')
+def saga_app():
+    # La saga a besoin du consommateur Kafka et de l'Outbox : on démarre les services explicitement
+    saga_app = create_app({'TESTING': True})
+    start_services(saga_app)
+    return saga_app
+
+@pytest.fixture
+def saga_client(saga_app):
+    with saga_app.test_client() as client:
+        yield client
+
 def test_health(client):
     result = client.get('/health-check')
     assert result.status_code == 200
     assert result.get_json() == {'status':'ok'}
 
-def test_saga(client):
+def test_saga(saga_client):
     """Smoke test for complete saga"""
     logger = Logger.get_instance("test")
     
@@ -29,9 +41,9 @@ def test_saga(client):
         "user_id": 1,
         "items": [{"product_id": 2, "quantity": 1}, {"product_id": 3, "quantity": 2}]
     }
-    response = client.post('/orders',
-                          data=json.dumps(product_data),
-                          content_type='application/json')
+    response = saga_client.post('/orders',
+                               data=json.dumps(product_data),
+                               content_type='application/json')
     
     assert response.status_code == 201, f"Failed to create order: {response.get_json()}"
     order_id = response.get_json()['order_id']
@@ -39,7 +51,7 @@ def test_saga(client):
     logger.debug(f"Created order with ID: {order_id}")
     
     # 2. Check if order really exists and whether it has a payment link
-    response = client.get(f'/orders/{order_id}')
+    response = saga_client.get(f'/orders/{order_id}')
     assert response.status_code == 201, f"Failed to get order: {response.get_json()}"
     response = response.get_json()
     logger.debug(response)